@@ -0,0 +1,300 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+CONFIRMED = {"$eq": ["$status", "confirmed"]}
+
+def booking_time_match(start: Optional[str] = None, end: Optional[str] = None) -> dict:
+    match = {}
+    if start:
+        match["$gte"] = start
+    if end:
+        match["$lt"] = end
+    return {"booking_time": match} if match else {}
+
+def _confirmed_totals() -> dict:
+    return {
+        "bookings": {"$sum": 1},
+        "seats": {"$sum": {"$size": "$seats"}},
+        "revenue": {"$sum": "$total_amount"}
+    }
+
+def _breakdown_by_show_field(field: str, lookup: Optional[dict] = None) -> list:
+    # Collapse to one row per show first so the shows lookup runs once per
+    # show rather than once per booking.
+    stages = [
+        {"$match": {"status": "confirmed"}},
+        {"$group": {"_id": "$show_id", **_confirmed_totals()}},
+        {"$lookup": {"from": "shows", "localField": "_id", "foreignField": "id", "as": "show"}},
+        {"$unwind": "$show"},
+        {"$group": {
+            "_id": f"$show.{field}",
+            "bookings": {"$sum": "$bookings"},
+            "seats": {"$sum": "$seats"},
+            "revenue": {"$sum": "$revenue"}
+        }}
+    ]
+    if lookup:
+        stages += [
+            {"$lookup": {"from": lookup["from"], "localField": "_id", "foreignField": "id", "as": "entity"}},
+            {"$addFields": {"name": {"$arrayElemAt": [f"$entity.{lookup['name']}", 0]}}},
+            {"$project": {"entity": 0}}
+        ]
+    stages.append({"$sort": {"revenue": -1, "_id": 1}})
+    return stages
+
+def analytics_pipeline(match: dict) -> list:
+    return [
+        {"$match": match},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "total_bookings": {"$sum": 1},
+                "confirmed_bookings": {"$sum": {"$cond": [CONFIRMED, 1, 0]}},
+                "total_revenue": {"$sum": {"$cond": [CONFIRMED, "$total_amount", 0]}},
+                "seats_sold": {"$sum": {"$cond": [CONFIRMED, {"$size": "$seats"}, 0]}}
+            }}],
+            "by_status": [
+                {"$group": {"_id": "$status", "bookings": {"$sum": 1}}},
+                {"$sort": {"_id": 1}}
+            ],
+            "by_day": [
+                {"$group": {
+                    "_id": {"$substr": ["$booking_time", 0, 10]},
+                    "bookings": {"$sum": 1},
+                    "confirmed_bookings": {"$sum": {"$cond": [CONFIRMED, 1, 0]}},
+                    "revenue": {"$sum": {"$cond": [CONFIRMED, "$total_amount", 0]}}
+                }},
+                {"$sort": {"_id": 1}}
+            ],
+            "by_movie": _breakdown_by_show_field("movie_id", {"from": "movies", "name": "title"}),
+            "by_theater": _breakdown_by_show_field("theater_id", {"from": "theaters", "name": "name"}),
+            "by_show_date": _breakdown_by_show_field("date")
+        }}
+    ]
+
+def _rows(rows: list, key: str) -> list:
+    return [{key: row.pop("_id"), **row} for row in rows]
+
+async def compute_analytics(db, start: Optional[str] = None, end: Optional[str] = None) -> dict:
+    result = await db.bookings.aggregate(analytics_pipeline(booking_time_match(start, end))).to_list(1)
+    facets = result[0] if result else {}
+    totals = (facets.get("totals") or [{}])[0]
+    return {
+        "total_bookings": totals.get("total_bookings", 0),
+        "confirmed_bookings": totals.get("confirmed_bookings", 0),
+        "total_revenue": totals.get("total_revenue", 0),
+        "seats_sold": totals.get("seats_sold", 0),
+        "by_status": {row["_id"]: row["bookings"] for row in facets.get("by_status", [])},
+        "by_movie": _rows(facets.get("by_movie", []), "movie_id"),
+        "by_theater": _rows(facets.get("by_theater", []), "theater_id"),
+        "by_show_date": _rows(facets.get("by_show_date", []), "date"),
+        "by_day": _rows(facets.get("by_day", []), "day")
+    }
+
+# Materialised rollups: one document per scope (global, day, show, movie,
+# theater, show_date), bumped with $inc whenever a booking changes status.
+# The "meta" scope holds bookkeeping: a marker once a full rebuild has run,
+# and a lock while one is running.
+
+REPORT_SCOPES = ["global", "day", "movie", "theater", "show_date"]
+ROLLUPS_BUILT = "meta:built"
+ROLLUPS_BUILDING = "meta:building"
+REBUILD_LOCK_SECONDS = 600
+
+def _rollup_scopes(booking: dict, show: Optional[dict]) -> List[Tuple[str, str]]:
+    scopes = [("global", ""), ("day", booking["booking_time"][:10])]
+    if show:
+        scopes += [
+            ("show", show["id"]),
+            ("movie", show["movie_id"]),
+            ("theater", show["theater_id"]),
+            ("show_date", show["date"])
+        ]
+    return scopes
+
+def rollup_ops(booking: dict, show: Optional[dict], old_status: Optional[str], new_status: str) -> List[UpdateOne]:
+    if old_status == new_status:
+        return []
+    inc = {f"status.{new_status}": 1}
+    if old_status is None:
+        inc["bookings"] = 1
+    else:
+        inc[f"status.{old_status}"] = -1
+    sign = (new_status == "confirmed") - (old_status == "confirmed")
+    if sign:
+        inc["revenue"] = sign * booking["total_amount"]
+        inc["seats"] = sign * len(booking["seats"])
+    return [
+        UpdateOne({"_id": f"{scope}:{key}"}, {"$inc": inc, "$setOnInsert": {"scope": scope, "key": key}}, upsert=True)
+        for scope, key in _rollup_scopes(booking, show)
+    ]
+
+async def apply_rollup_ops(db, ops: List[UpdateOne]):
+    if ops:
+        await db.analytics_rollups.bulk_write(ops, ordered=False)
+
+def _rollup_row(doc: dict) -> dict:
+    status = doc.get("status", {})
+    return {
+        "bookings": status.get("confirmed", 0),
+        "seats": doc.get("seats", 0),
+        "revenue": doc.get("revenue", 0)
+    }
+
+async def read_rollups(db) -> dict:
+    # Per-show rollups are kept for drill-downs but are not part of this
+    # report, so the read stays proportional to movies, theaters and days.
+    docs = await db.analytics_rollups.find({"scope": {"$in": REPORT_SCOPES}}).to_list(None)
+    by_scope: Dict[str, List[dict]] = {}
+    for doc in docs:
+        by_scope.setdefault(doc["scope"], []).append(doc)
+
+    totals = (by_scope.get("global") or [{}])[0]
+    status = totals.get("status", {})
+    movie_ids = [doc["key"] for doc in by_scope.get("movie", [])]
+    theater_ids = [doc["key"] for doc in by_scope.get("theater", [])]
+    movies, theaters = await asyncio.gather(
+        db.movies.find({"id": {"$in": movie_ids}}, {"_id": 0, "id": 1, "title": 1}).to_list(None),
+        db.theaters.find({"id": {"$in": theater_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    )
+    names = {m["id"]: m["title"] for m in movies}
+    names.update({t["id"]: t["name"] for t in theaters})
+
+    def breakdown(scope: str, key: str, named: bool = False) -> list:
+        rows = [{key: doc["key"], **_rollup_row(doc)} for doc in by_scope.get(scope, []) if doc.get("status", {}).get("confirmed")]
+        if named:
+            for row in rows:
+                row["name"] = names.get(row[key])
+        return sorted(rows, key=lambda row: (-row["revenue"], row[key]))
+
+    return {
+        "total_bookings": totals.get("bookings", 0),
+        "confirmed_bookings": status.get("confirmed", 0),
+        "total_revenue": totals.get("revenue", 0),
+        "seats_sold": totals.get("seats", 0),
+        "by_status": {k: v for k, v in sorted(status.items()) if v},
+        "by_movie": breakdown("movie", "movie_id", named=True),
+        "by_theater": breakdown("theater", "theater_id", named=True),
+        "by_show_date": breakdown("show_date", "date"),
+        "by_day": sorted([
+            {
+                "day": doc["key"],
+                "bookings": doc.get("bookings", 0),
+                "confirmed_bookings": doc.get("status", {}).get("confirmed", 0),
+                "revenue": doc.get("revenue", 0)
+            }
+            for doc in by_scope.get("day", [])
+        ], key=lambda row: row["day"])
+    }
+
+async def recompute_rollups(db) -> Dict[str, dict]:
+    rows = await db.bookings.aggregate([
+        {"$group": {
+            "_id": {"show_id": "$show_id", "day": {"$substr": ["$booking_time", 0, 10]}, "status": "$status"},
+            "bookings": {"$sum": 1},
+            "seats": {"$sum": {"$size": "$seats"}},
+            "revenue": {"$sum": "$total_amount"}
+        }}
+    ]).to_list(None)
+    show_ids = list({row["_id"]["show_id"] for row in rows})
+    shows = await db.shows.find({"id": {"$in": show_ids}}, {"_id": 0}).to_list(None)
+    shows_by_id = {show["id"]: show for show in shows}
+
+    rollups: Dict[str, dict] = {}
+    for row in rows:
+        group = row["_id"]
+        booking = {"booking_time": group["day"]}
+        for scope, key in _rollup_scopes(booking, shows_by_id.get(group["show_id"])):
+            doc = rollups.setdefault(f"{scope}:{key}", {"_id": f"{scope}:{key}", "scope": scope, "key": key, "bookings": 0, "status": {}, "revenue": 0, "seats": 0})
+            doc["bookings"] += row["bookings"]
+            doc["status"][group["status"]] = doc["status"].get(group["status"], 0) + row["bookings"]
+            if group["status"] == "confirmed":
+                doc["revenue"] += row["revenue"]
+                doc["seats"] += row["seats"]
+    return rollups
+
+def _flatten(doc: dict) -> Dict[str, float]:
+    flat = {"bookings": doc.get("bookings", 0), "revenue": doc.get("revenue", 0), "seats": doc.get("seats", 0)}
+    flat.update({f"status.{k}": v for k, v in doc.get("status", {}).items()})
+    return flat
+
+async def rebuild_rollups(db, dry_run: bool = False) -> dict:
+    # Increments that land while this runs can be lost when the collection is
+    # swapped, so run it when booking traffic is quiet.
+    expected = await recompute_rollups(db)
+    stored = {doc["_id"]: doc for doc in await db.analytics_rollups.find({"scope": {"$ne": "meta"}}).to_list(None)}
+
+    drift = []
+    for rollup_id in sorted(set(expected) | set(stored)):
+        want = _flatten(expected.get(rollup_id, {}))
+        have = _flatten(stored.get(rollup_id, {}))
+        for field in sorted(set(want) | set(have)):
+            if abs(want.get(field, 0) - have.get(field, 0)) > 1e-6:
+                drift.append({"rollup": rollup_id, "field": field, "stored": have.get(field, 0), "actual": want.get(field, 0)})
+
+    if not dry_run:
+        await db.analytics_rollups.delete_many({"scope": {"$ne": "meta"}})
+        if expected:
+            await db.analytics_rollups.insert_many(list(expected.values()))
+        await db.analytics_rollups.update_one(
+            {"_id": ROLLUPS_BUILT},
+            {"$set": {"scope": "meta", "key": "built", "built_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+
+    return {"rollups": len(expected), "drift": drift, "rebuilt": not dry_run}
+
+async def rollups_built(db) -> bool:
+    return await db.analytics_rollups.find_one({"_id": ROLLUPS_BUILT}, {"_id": 1}) is not None
+
+async def ensure_rollups(db) -> bool:
+    # Builds the rollups for a database whose bookings predate them. Only one
+    # worker builds; a lock left behind by a crashed worker is taken over once
+    # it is REBUILD_LOCK_SECONDS old. Returns whether this call built them.
+    if await rollups_built(db):
+        return False
+    now = datetime.now(timezone.utc)
+    try:
+        await db.analytics_rollups.insert_one({"_id": ROLLUPS_BUILDING, "scope": "meta", "key": "building", "started_at": now.isoformat()})
+    except DuplicateKeyError:
+        stale = (now - timedelta(seconds=REBUILD_LOCK_SECONDS)).isoformat()
+        result = await db.analytics_rollups.update_one(
+            {"_id": ROLLUPS_BUILDING, "started_at": {"$lt": stale}},
+            {"$set": {"started_at": now.isoformat()}}
+        )
+        if result.modified_count == 0:
+            return False
+    try:
+        await rebuild_rollups(db)
+    finally:
+        await db.analytics_rollups.delete_one({"_id": ROLLUPS_BUILDING})
+    return True
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Analytics rollup maintenance")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        report = await rebuild_rollups(client[os.environ['DB_NAME']], dry_run=args.command == "check")
+        client.close()
+        for item in report["drift"]:
+            print(f"{item['rollup']} {item['field']}: stored={item['stored']} actual={item['actual']}")
+        print(f"{report['rollups']} rollups, {len(report['drift'])} drifted fields, rebuilt={report['rebuilt']}")
+        if args.command == "check" and report["drift"]:
+            raise SystemExit(1)
+
+    asyncio.run(main())
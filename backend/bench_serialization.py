@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+# Measures the CPU it takes to turn a page of stored documents into a JSON
+# response body, per serialisation path the read endpoints have used:
+#
+#   response_model    validate against List[Model], dump in JSON mode, json.dumps
+#                     (FastAPI's path for endpoints declaring a response_model)
+#   jsonable_encoder  jsonable_encoder + json.dumps (endpoints returning dicts)
+#   model_dump        Model(**doc).model_dump() per item + json.dumps
+#                     (STRICT_RESPONSE_VALIDATION)
+#   orjson            orjson.dumps on the documents as Motor returned them
+#
+# No database is needed.
+#
+#   python bench_serialization.py --items 1000 --repeat 50
+
+load_dotenv(Path(__file__).parent / '.env')
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "cinebook_bench")
+
+from serialization import dumps
+from server import Booking, Movie, Show
+
+def movie_doc(rng: random.Random, i: int) -> dict:
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "title": f"Movie {i}",
+        "description": "A synthetic movie used to benchmark response serialisation. " * 3,
+        "genre": rng.choice(["Action", "Drama", "Comedy", "Sci-Fi"]),
+        "duration": rng.randint(80, 180),
+        "rating": rng.choice(["G", "PG", "PG-13", "R"]),
+        "poster_url": f"https://images.example.com/posters/{i}.jpg",
+        "backdrop_url": f"https://images.example.com/backdrops/{i}.jpg",
+        "release_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "created_at": "2025-01-01T00:00:00+00:00"
+    }
+
+def show_doc(rng: random.Random, i: int) -> dict:
+    start = rng.randint(9, 21)
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "movie_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "theater_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "screen_number": rng.randint(1, 6),
+        "start_time": f"{start:02d}:00",
+        "end_time": f"{start + 2:02d}:30",
+        "price": rng.choice([9.5, 12.5, 15.0]),
+        "date": f"2025-06-{rng.randint(1, 28):02d}",
+        "created_at": "2025-01-01T00:00:00+00:00"
+    }
+
+def booking_doc(rng: random.Random, i: int) -> dict:
+    seats = [f"{rng.choice('ABCDEFGH')}{rng.randint(1, 12)}" for _ in range(rng.randint(1, 4))]
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "show_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "seats": seats,
+        "total_amount": 12.5 * len(seats),
+        "status": rng.choice(["confirmed", "cancelled", "expired"]),
+        "booking_time": "2025-06-01T12:00:00+00:00",
+        "hold_expires_at": None,
+        "payment_session_id": f"cs_test_{i}"
+    }
+
+DATASETS = {"movies": (Movie, movie_doc), "shows": (Show, show_doc), "bookings": (Booking, booking_doc)}
+
+def serialisers(model) -> Dict[str, Callable[[List[dict]], bytes]]:
+    adapter = TypeAdapter(List[model])
+    return {
+        "response_model": lambda docs: json.dumps(adapter.dump_python(adapter.validate_python(docs), mode="json"), separators=(",", ":")).encode(),
+        "jsonable_encoder": lambda docs: json.dumps(jsonable_encoder(docs), separators=(",", ":")).encode(),
+        "model_dump": lambda docs: json.dumps([model(**doc).model_dump() for doc in docs], separators=(",", ":")).encode(),
+        "orjson": dumps
+    }
+
+def cpu_ms(serialise: Callable[[List[dict]], bytes], docs: List[dict], repeat: int) -> float:
+    serialise(docs)
+    started = time.process_time()
+    for _ in range(repeat):
+        serialise(docs)
+    return (time.process_time() - started) * 1000 / repeat
+
+def run(items: int, repeat: int, seed: int) -> Dict[str, Dict[str, dict]]:
+    results = {}
+    for name, (model, make) in DATASETS.items():
+        rng = random.Random(seed)
+        docs = [make(rng, i) for i in range(items)]
+        timings = {path: cpu_ms(serialise, docs, repeat) for path, serialise in serialisers(model).items()}
+        results[name] = {
+            path: {"cpu_ms": round(ms, 3), "cpu_ms_per_1000": round(ms * 1000 / items, 3), "saved_by_orjson_ms": round(ms - timings["orjson"], 3)}
+            for path, ms in timings.items()
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU cost of serialising read-endpoint responses")
+    parser.add_argument("--items", type=int, default=1000, help="documents per response")
+    parser.add_argument("--repeat", type=int, default=50, help="responses serialised per path")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.items, args.repeat, args.seed)
+
+    print(f"{'dataset':10} {'path':18} {'cpu ms':>9} {'ms/1000':>9} {'saved ms':>9}")
+    for dataset, paths in results.items():
+        for path, result in paths.items():
+            print(f"{dataset:10} {path:18} {result['cpu_ms']:>9} {result['cpu_ms_per_1000']:>9} {result['saved_by_orjson_ms']:>9}")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"parameters": vars(args), "results": results}, indent=2))
@@ -0,0 +1,420 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from pymongo import monitoring
+
+# Benchmarks the booking hot paths end to end: seeds synthetic data into a
+# dedicated database, serves the app with uvicorn in this process, drives
+# concurrent HTTP and WebSocket clients and reports latency, throughput and
+# Mongo commands per request. Runs against --mongo-url, a throwaway local
+# mongod (--spawn-mongod, needs mongod on PATH), or with --in-memory an
+# in-process mongomock database that needs no server at all. In-memory runs
+# time the app plus mongomock and cannot count Mongo commands, so they are
+# only compared with a baseline recorded --in-memory as well.
+#
+# bench-baseline.json is such a baseline, sized to finish in a couple of
+# minutes. CI runs, from backend/ with requirements.txt installed:
+#
+#   python benchmark.py --in-memory --theaters 2 --screens 2 --days 3 --users 20 \
+#       --requests 200 --concurrency 10 --ws-clients 50 --ws-rounds 10 --runs 5 \
+#       --check bench-baseline.json
+#
+# which exits 1 on a regression. Absolute timings depend on the machine and
+# are only reported; --check gates on failed requests, status codes the
+# baseline never saw, Mongo commands per request, and each scenario's p50
+# as a multiple of the `reference` scenario's, which moves by under 20%
+# between runs. Re-record (same command, --save-baseline instead of --check)
+# after an intended change in cost. Against a real server:
+#
+#   python benchmark.py --spawn-mongod --save-baseline mongod-baseline.json
+#   python benchmark.py --spawn-mongod --check mongod-baseline.json
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def summarise(name: str, latencies: List[float], statuses: Counter, elapsed: float, db_ops: Optional[int]) -> dict:
+    requests = sum(statuses.values())
+    return {
+        "scenario": name,
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status == "error" or status >= 500),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+        "db_ops_per_request": round(db_ops / requests, 2) if requests and db_ops is not None else None
+    }
+
+async def run_scenario(name: str, call: Callable[[int], Awaitable[int]], requests: int, concurrency: int, counter: Optional[CommandCounter]) -> dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            started = time.perf_counter()
+            try:
+                status = await call(i)
+            except Exception:
+                status = "error"
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    ops_before = counter.count if counter else None
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarise(name, latencies, statuses, time.perf_counter() - started, counter.count - ops_before if counter else None)
+
+async def run_ws_fanout(http: httpx.AsyncClient, ws_url: str, show_id: str, headers: dict, clients: int, rounds: int, counter: Optional[CommandCounter]) -> dict:
+    import websockets
+
+    sockets = [await websockets.connect(f"{ws_url}/ws/seats/{show_id}") for _ in range(clients)]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    seat_map = (await http.get(f"/api/shows/{show_id}/seats")).json()["seats"]
+    free = [seat["seat_number"] for row in seat_map for seat in row if seat["status"] == "available"]
+    random.shuffle(free)
+
+    async def receive(sock, seat: str, sent: float):
+        # Each round booking fans out as one seat_update per client; time
+        # how long every subscriber takes to see it.
+        while True:
+            message = json.loads(await sock.recv())
+            if message.get("type") == "seat_update" and seat in message.get("seats", []):
+                latencies.append(time.perf_counter() - sent)
+                return
+
+    ops_before = counter.count if counter else None
+    started = time.perf_counter()
+    try:
+        for seat in free[:rounds]:
+            sent = time.perf_counter()
+            waiting = [asyncio.create_task(receive(sock, seat, sent)) for sock in sockets]
+            response = await http.post("/api/bookings", json={"show_id": show_id, "seats": [seat]}, headers=headers)
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                await asyncio.wait_for(asyncio.gather(*waiting), 10)
+            else:
+                for task in waiting:
+                    task.cancel()
+    finally:
+        for sock in sockets:
+            await sock.close()
+    result = summarise("ws_fanout", latencies, statuses, time.perf_counter() - started, counter.count - ops_before if counter else None)
+    result["deliveries"] = len(latencies)
+    result["clients"] = clients
+    return result
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def spawn_mongod() -> tuple:
+    binary = shutil.which("mongod")
+    if binary is None:
+        raise SystemExit("--spawn-mongod needs a mongod binary on PATH")
+    dbpath = tempfile.mkdtemp(prefix="cinebook-bench-")
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return process, dbpath, f"mongodb://127.0.0.1:{port}"
+
+async def wait_for_mongo(url: str, timeout: float = 30):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=1000)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                await client.admin.command("ping")
+                return
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"MongoDB at {url} did not come up")
+                await asyncio.sleep(0.5)
+    finally:
+        client.close()
+
+def compare(results: Dict[str, dict], baseline: dict, tolerance: float) -> List[str]:
+    # Absolute timings only hold on the machine that recorded them, so they are
+    # reported but not gated. What is gated travels between machines: failed
+    # requests, status codes the baseline never saw, p50 relative to the
+    # reference scenario run in the same process, and Mongo commands per
+    # request.
+    regressions = []
+    for name, base in baseline["scenarios"].items():
+        current = results.get(name)
+        if current is None:
+            regressions.append(f"{name}: scenario missing from this run")
+            continue
+        if current.get("errors"):
+            regressions.append(f"{name}: {current['errors']} failed requests")
+        unexpected = sorted(set(current["statuses"]) - set(base["statuses"]))
+        if unexpected:
+            regressions.append(f"{name}: statuses {unexpected} not seen in the baseline")
+        if base.get("relative_p50") and current.get("relative_p50") and current["relative_p50"] > base["relative_p50"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 is {current['relative_p50']}x the reference, baseline {base['relative_p50']}x (+{tolerance:.0%})")
+        # Command counts barely vary between runs, so hold them to a tighter bound.
+        if base.get("db_ops_per_request") is not None and current.get("db_ops_per_request") is not None:
+            if current["db_ops_per_request"] > base["db_ops_per_request"] * 1.1 + 0.5:
+                regressions.append(f"{name}: db_ops_per_request {current['db_ops_per_request']} > baseline {base['db_ops_per_request']}")
+    return regressions
+
+def combine_runs(runs: List[Dict[str, dict]]) -> Dict[str, dict]:
+    # Tail latencies on a shared machine swing by 2x between identical runs;
+    # the median of each metric across runs is what gets compared.
+    combined = {}
+    for name in runs[0]:
+        samples = [run[name] for run in runs if name in run]
+        result = dict(samples[-1])
+        for field in ("p50_ms", "p99_ms", "throughput_rps", "db_ops_per_request", "relative_p50"):
+            values = [sample[field] for sample in samples if sample.get(field) is not None]
+            result[field] = round(statistics.median(values), 2) if values else None
+        for field in ("requests", "errors", "deliveries"):
+            if field in result:
+                result[field] = sum(sample[field] for sample in samples)
+        result["statuses"] = dict(sum((Counter(sample["statuses"]) for sample in samples), Counter()))
+        result["runs"] = len(samples)
+        combined[name] = result
+    return combined
+
+async def run_benchmark(args) -> Dict[str, dict]:
+    counter = None if args.in_memory else CommandCounter()
+    # Must be registered before server.py creates its client.
+    if counter:
+        monitoring.register(counter)
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    sys.path.insert(0, str(Path(__file__).parent))
+    import uvicorn
+    import server
+    from indexes import ensure_indexes
+    from seed_data import seed_synthetic, synthetic_user_email
+
+    if args.in_memory:
+        from mongo_memory import memory_database
+
+        server.db = server.catalog.db = memory_database(args.db_name)
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async def seed() -> dict:
+        print(f"Seeding {args.db_name}...")
+        seeded = await seed_synthetic(
+            server.db,
+            theaters=args.theaters,
+            screens_per_theater=args.screens,
+            days=args.days,
+            shows_per_screen=args.shows_per_screen,
+            fill_ratio=args.fill_ratio,
+            users=max(args.users, 1),
+            rows=args.rows,
+            seats_per_row=args.seats_per_row,
+            seed=args.seed
+        )
+        print(f"Seeded {seeded['counts']}")
+        return seeded
+
+    seeded = await seed()
+    port = free_port()
+    # Keep-alive outlasts the client timeout, so a slow request never finds
+    # its pooled connection closed under it.
+    uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning", ws="websockets", timeout_keep_alive=75))
+    serving = asyncio.create_task(uv.serve())
+    while not uv.started:
+        await asyncio.sleep(0.05)
+
+    runs: List[Dict[str, dict]] = []
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as http:
+            async def login(email: str) -> dict:
+                response = await http.post("/api/auth/login", json={"email": email, "password": seeded["password"]})
+                response.raise_for_status()
+                return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            user_headers = await asyncio.gather(*[login(synthetic_user_email(i)) for i in range(seeded["users"])])
+            admin_headers = await login(seeded["admin_email"])
+            show_ids = seeded["show_ids"]
+            seat_numbers = seeded["seat_numbers"]
+
+            for run in range(args.runs):
+                if run:
+                    # The app keeps serving between runs, so put back the
+                    # indexes the reseed dropped and forget cached documents.
+                    # Ids come from the seed and survive the reseed.
+                    print(f"Run {run + 1} of {args.runs}")
+                    await seed()
+                    await ensure_indexes(server.db)
+                    server.catalog.entries.clear()
+                    server.catalog.bodies.clear()
+                rng = random.Random(args.seed)
+                results: Dict[str, dict] = {}
+
+                async def get_show(i: int) -> int:
+                    return (await http.get(f"/api/shows/{rng.choice(show_ids)}")).status_code
+
+                async def get_seats(i: int) -> int:
+                    return (await http.get(f"/api/shows/{rng.choice(show_ids)}/seats")).status_code
+
+                async def create_booking(i: int) -> int:
+                    seats = rng.sample(seat_numbers, 2)
+                    response = await http.post("/api/bookings", json={"show_id": rng.choice(show_ids), "seats": seats}, headers=user_headers[i % len(user_headers)])
+                    return response.status_code
+
+                async def my_bookings(i: int) -> int:
+                    return (await http.get("/api/bookings/my", headers=user_headers[i % len(user_headers)])).status_code
+
+                async def admin_analytics(i: int) -> int:
+                    return (await http.get("/api/admin/analytics", headers=admin_headers)).status_code
+
+                async def admin_analytics_live(i: int) -> int:
+                    return (await http.get("/api/admin/analytics", params={"source": "live"}, headers=admin_headers)).status_code
+
+                # A catalog-cached read, so only HTTP handling and
+                # serialisation; the other p50s are gated relative to it.
+                scenarios = [
+                    ("reference", get_show, args.requests),
+                    ("get_seats", get_seats, args.requests),
+                    ("create_booking", create_booking, args.requests),
+                    ("my_bookings", my_bookings, args.requests),
+                    ("admin_analytics", admin_analytics, args.requests),
+                    ("admin_analytics_live", admin_analytics_live, max(args.requests // 10, 1))
+                ]
+                for name, call, requests in scenarios:
+                    if args.only and name not in args.only and name != "reference":
+                        continue
+                    print(f"Running {name}...")
+                    results[name] = await run_scenario(name, call, requests, args.concurrency, counter)
+
+                if args.ws_clients and (not args.only or "ws_fanout" in args.only):
+                    print("Running ws_fanout...")
+                    results["ws_fanout"] = await run_ws_fanout(
+                        http, f"ws://127.0.0.1:{port}", rng.choice(show_ids), user_headers[0],
+                        args.ws_clients, args.ws_rounds, counter
+                    )
+                reference = results["reference"]["p50_ms"]
+                for result in results.values():
+                    result["relative_p50"] = round(result["p50_ms"] / reference, 3) if reference and result["p50_ms"] else None
+                runs.append(results)
+    finally:
+        uv.should_exit = True
+        await serving
+    return combine_runs(runs)
+
+def print_results(results: Dict[str, dict]):
+    print(f"\n{'scenario':22} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} {'db ops/req':>10} {'rel p50':>8}")
+    for result in results.values():
+        print(
+            f"{result['scenario']:22} {result['requests']:>8} {result['errors']:>6} "
+            f"{result['p50_ms'] if result['p50_ms'] is not None else '-':>9} "
+            f"{result['p99_ms'] if result['p99_ms'] is not None else '-':>9} "
+            f"{result['throughput_rps'] if result['throughput_rps'] is not None else '-':>9} "
+            f"{result['db_ops_per_request'] if result['db_ops_per_request'] is not None else '-':>10} "
+            f"{result['relative_p50'] if result.get('relative_p50') is not None else '-':>8}"
+        )
+        print(f"{'':22} statuses {result['statuses']}")
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Benchmark booking hot paths against synthetic data")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="cinebook_bench", help="dropped and reseeded on every run")
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument("--spawn-mongod", action="store_true", help="run against a throwaway local mongod")
+    backend.add_argument("--in-memory", action="store_true", help="run against an in-process mongomock database")
+    parser.add_argument("--theaters", type=int, default=5)
+    parser.add_argument("--screens", type=int, default=4)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--shows-per-screen", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=10, help="seat rows per screen")
+    parser.add_argument("--seats-per-row", type=int, default=20)
+    parser.add_argument("--fill-ratio", type=float, default=0.3, help="fraction of each show's seats already booked")
+    parser.add_argument("--users", type=int, default=50, help="users that log in and drive requests")
+    parser.add_argument("--requests", type=int, default=500, help="requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ws-clients", type=int, default=200)
+    parser.add_argument("--ws-rounds", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    parser.add_argument("--runs", type=int, default=1, help="reseed and repeat the whole benchmark, reporting medians")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--save-baseline", help="store results as the baseline at this path")
+    parser.add_argument("--check", help="compare against the baseline at this path and exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed growth of p50 relative to the reference scenario for --check")
+    args = parser.parse_args()
+
+    if args.db_name == os.getenv("DB_NAME"):
+        raise SystemExit("Refusing to benchmark against the application database; pick another --db-name")
+
+    mongod = None
+    if args.spawn_mongod:
+        mongod, dbpath, args.mongo_url = spawn_mongod()
+    try:
+        if mongod:
+            asyncio.run(wait_for_mongo(args.mongo_url))
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        if mongod:
+            mongod.terminate()
+            mongod.wait()
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+    print_results(results)
+    parameters = {k: v for k, v in vars(args).items() if k in ("in_memory", "theaters", "screens", "days", "shows_per_screen", "rows", "seats_per_row", "fill_ratio", "users", "requests", "concurrency", "ws_clients", "ws_rounds", "runs", "seed")}
+    report = {"parameters": parameters, "scenarios": results}
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.check:
+        baseline = json.loads(Path(args.check).read_text())
+        if baseline.get("parameters", {}).get("in_memory", False) != args.in_memory:
+            raise SystemExit("Baseline and this run use different database backends; re-record it with matching --in-memory")
+        if baseline.get("parameters") != parameters:
+            print(f"\nWarning: baseline was recorded with different parameters: {baseline.get('parameters')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for regression in regressions:
+                print(f"  {regression}")
+            raise SystemExit(1)
+        print("\nNo regressions against baseline")
@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from serialization import dumps
+
+_MISSING = object()
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] < time.monotonic():
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+        }
+
+class PrecomputedBody:
+    def __init__(self, content: Any, next_cursor: Optional[str] = None):
+        self.next_cursor = next_cursor
+        self.body = dumps(content)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        self._gzipped: Optional[bytes] = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+
+class CatalogCache:
+    # Read-through cache for movies, theaters and shows. Cached documents are
+    # shared between requests and must be treated as read-only by callers.
+    # Response bodies are keyed by a per-collection generation, so one
+    # invalidation drops every cached list for that collection at once. They
+    # live in their own LRU: page keys come from client input, and must not be
+    # able to push the entity documents out.
+    def __init__(self, db, maxsize: int = 10000, ttl: float = 60.0, body_maxsize: int = 1000):
+        self.db = db
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.bodies = TTLCache(maxsize=body_maxsize, ttl=ttl)
+        self.generations: Dict[str, int] = {}
+
+    async def get(self, collection: str, entity_id: str) -> Optional[dict]:
+        key = (collection, entity_id)
+        doc = self.entries.get(key)
+        if doc is None:
+            doc = await self.db[collection].find_one({"id": entity_id}, {"_id": 0})
+            if doc is not None:
+                self.entries.set(key, doc)
+        return doc
+
+    async def get_many(self, collection: str, entity_ids: Iterable[str]) -> Dict[str, dict]:
+        found = {}
+        missing = []
+        for entity_id in set(entity_ids):
+            doc = self.entries.get((collection, entity_id))
+            if doc is None:
+                missing.append(entity_id)
+            else:
+                found[entity_id] = doc
+        if missing:
+            for doc in await self.db[collection].find({"id": {"$in": missing}}, {"_id": 0}).to_list(None):
+                self.entries.set((collection, doc["id"]), doc)
+                found[doc["id"]] = doc
+        return found
+
+    def body_key(self, collection: str, key: str) -> tuple:
+        # Taken before building a body, so a build that races an invalidation
+        # is stored under the old generation and never served.
+        return (collection, self.generations.get(collection, 0), key)
+
+    def invalidate(self, collection: str, entity_id: Optional[str] = None):
+        if entity_id is not None:
+            self.entries.delete((collection, entity_id))
+        self.generations[collection] = self.generations.get(collection, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.entries.stats(), "bodies": self.bodies.stats()}
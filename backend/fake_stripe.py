@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Minimal stand-in for the Stripe checkout API, for exercising the payment
+# client offline. Point the backend at it with STRIPE_API_BASE, e.g.
+#   python fake_stripe.py --port 12111 --latency-ms 200 --error-rate 0.1
+#   STRIPE_API_BASE=http://localhost:12111 uvicorn server:app
+
+app = FastAPI()
+app.state.latency_ms = 0
+app.state.jitter_ms = 0
+app.state.error_rate = 0.0
+app.state.pay_after = 2.0
+sessions = {}
+
+class StripeError(Exception):
+    def __init__(self, status_code: int, error_type: str, message: str):
+        self.status_code = status_code
+        self.error_type = error_type
+        self.message = message
+
+@app.exception_handler(StripeError)
+async def stripe_error_handler(request: Request, exc: StripeError):
+    return JSONResponse(status_code=exc.status_code, content={"error": {"type": exc.error_type, "message": exc.message}})
+
+async def simulate_provider():
+    delay = app.state.latency_ms + random.uniform(0, app.state.jitter_ms)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+    if random.random() < app.state.error_rate:
+        raise StripeError(500, "api_error", "Simulated provider failure")
+
+def session_view(session: dict) -> dict:
+    paid = time.monotonic() - session["created"] >= app.state.pay_after
+    return {
+        "id": session["id"],
+        "object": "checkout.session",
+        "url": f"https://checkout.stripe.test/pay/{session['id']}",
+        "amount_total": session["amount_total"],
+        "currency": session["currency"],
+        "metadata": session["metadata"],
+        "mode": "payment",
+        "status": "complete" if paid else "open",
+        "payment_status": "paid" if paid else "unpaid",
+        "success_url": session["success_url"],
+        "cancel_url": session["cancel_url"]
+    }
+
+@app.post("/v1/checkout/sessions")
+async def create_session(request: Request):
+    await simulate_provider()
+    form = parse_qsl((await request.body()).decode())
+    fields = dict(form)
+    metadata = {key[len("metadata["):-1]: value for key, value in form if key.startswith("metadata[")}
+    amount = next((value for key, value in form if key.endswith("[unit_amount]")), fields.get("amount", "0"))
+    currency = next((value for key, value in form if key.endswith("[currency]")), fields.get("currency", "usd"))
+    session = {
+        "id": f"cs_test_{uuid.uuid4().hex}",
+        "created": time.monotonic(),
+        "amount_total": int(float(amount)),
+        "currency": currency,
+        "metadata": metadata,
+        "success_url": fields.get("success_url"),
+        "cancel_url": fields.get("cancel_url")
+    }
+    sessions[session["id"]] = session
+    return session_view(session)
+
+@app.get("/v1/checkout/sessions/{session_id}")
+async def get_session(session_id: str):
+    await simulate_provider()
+    session = sessions.get(session_id)
+    if session is None:
+        raise StripeError(404, "invalid_request_error", f"No such checkout.session: '{session_id}'")
+    return session_view(session)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Stripe checkout API for offline payment tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency-ms", type=float, default=0, help="fixed delay added to every call")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="extra random delay up to this many ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with a 500")
+    parser.add_argument("--pay-after", type=float, default=2.0, help="seconds until a session reports paid")
+    args = parser.parse_args()
+
+    app.state.latency_ms = args.latency_ms
+    app.state.jitter_ms = args.jitter_ms
+    app.state.error_rate = args.error_rate
+    app.state.pay_after = args.pay_after
+    uvicorn.run(app, host=args.host, port=args.port)
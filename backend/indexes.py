@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True)
+    ],
+    "movies": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)])
+    ],
+    "theaters": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)])
+    ],
+    "shows": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("movie_id", ASCENDING), ("date", ASCENDING), ("theater_id", ASCENDING)]),
+        IndexModel([("theater_id", ASCENDING), ("date", ASCENDING)]),
+        IndexModel([("date", ASCENDING), ("start_time", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("movie_id", ASCENDING), ("date", ASCENDING), ("start_time", ASCENDING), ("id", ASCENDING)])
+    ],
+    "bookings": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("show_id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("booking_time", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("hold_expires_at", ASCENDING)]),
+        IndexModel([("expired_by", ASCENDING)], sparse=True),
+        IndexModel([("booking_time", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("booking_time", DESCENDING), ("id", DESCENDING)])
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], unique=True),
+        IndexModel([("booking_id", ASCENDING)])
+    ],
+    "seat_inventory": [
+        IndexModel([("show_id", ASCENDING)], unique=True),
+        IndexModel([("claims.hold_expires_at", ASCENDING)], sparse=True)
+    ],
+    "analytics_rollups": [
+        IndexModel([("scope", ASCENDING)])
+    ],
+    "webhook_events": [
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)]),
+        IndexModel([("received_at", ASCENDING)]),
+        IndexModel([("claimed_by", ASCENDING)], sparse=True)
+    ]
+}
+
+# Representative shape of every hot query in server.py; values are
+# placeholders, only the filter/sort shape matters to the planner.
+QUERY_SHAPES = [
+    ("login", "users", {"email": "x@example.com"}, None),
+    ("current_user", "users", {"id": "x"}, None),
+    ("get_movie", "movies", {"id": "x"}, None),
+    ("get_movies", "movies", {}, [("created_at", 1), ("id", 1)]),
+    ("get_theaters", "theaters", {}, [("created_at", 1), ("id", 1)]),
+    ("get_theater", "theaters", {"id": "x"}, None),
+    ("get_show", "shows", {"id": "x"}, None),
+    ("get_shows", "shows", {"movie_id": "x", "date": "2025-01-01", "theater_id": "x"}, [("date", 1), ("start_time", 1), ("id", 1)]),
+    ("get_shows_by_movie", "shows", {"movie_id": "x"}, [("date", 1), ("start_time", 1), ("id", 1)]),
+    ("get_shows_all", "shows", {}, [("date", 1), ("start_time", 1), ("id", 1)]),
+    ("seat_inventory", "seat_inventory", {"show_id": "x"}, None),
+    ("expired_claims", "seat_inventory", {"claims.hold_expires_at": {"$lt": "2025-01-01"}}, None),
+    ("inventory_backfill", "bookings", {"show_id": "x", "status": {"$in": ["confirmed", "pending"]}}, None),
+    ("get_booking", "bookings", {"id": "x"}, None),
+    ("my_bookings", "bookings", {"user_id": "x"}, [("booking_time", -1), ("id", -1)]),
+    ("admin_bookings", "bookings", {}, [("booking_time", -1), ("id", -1)]),
+    ("admin_bookings_by_status", "bookings", {"status": "confirmed"}, [("booking_time", -1), ("id", -1)]),
+    ("expired_holds", "bookings", {"status": "pending", "hold_expires_at": {"$lt": "2025-01-01"}}, None),
+    ("legacy_holds", "bookings", {"status": "pending", "hold_expires_at": None, "booking_time": {"$lt": "2025-01-01"}}, None),
+    ("expired_sweep", "bookings", {"expired_by": "x"}, None),
+    ("payment_status", "payment_transactions", {"session_id": "x"}, None),
+    ("webhook_claimable", "webhook_events", {"$or": [{"status": "queued"}, {"status": "processing", "lease_until": {"$lt": "2025-01-01"}}]}, [("received_at", 1)]),
+    ("webhook_claimed", "webhook_events", {"claimed_by": "x"}, None)
+]
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    created = {}
+    for collection, models in REQUIRED_INDEXES.items():
+        try:
+            created[collection] = await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # Typically duplicate data blocking a unique index; keep serving
+            # and surface it loudly instead of refusing to start.
+            logger.error(f"Could not create indexes on {collection}: {e}")
+    return created
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return [stage for stage in stages if stage]
+
+async def explain_query_shapes(db) -> List[dict]:
+    report = []
+    for name, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "query": name,
+            "collection": collection,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
+
+async def check_query_plans(db) -> List[dict]:
+    report = await explain_query_shapes(db)
+    for item in report:
+        if item["collscan"]:
+            logger.warning(f"Query '{item['query']}' on {item['collection']} uses a COLLSCAN: {' <- '.join(item['stages'])}")
+    return [item for item in report if item["collscan"]]
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Create required indexes and verify query plans")
+    parser.add_argument("--explain", action="store_true", help="report hot queries that still use a COLLSCAN")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        for collection, names in (await ensure_indexes(db)).items():
+            print(f"{collection}: {', '.join(names)}")
+        collscans = []
+        if args.explain:
+            for item in await explain_query_shapes(db):
+                print(f"{'COLLSCAN' if item['collscan'] else 'ok':8} {item['query']:20} {' <- '.join(item['stages'])}")
+                collscans += [item] if item["collscan"] else []
+        client.close()
+        if collscans:
+            raise SystemExit(1)
+
+    asyncio.run(main())
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_OPS_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {count}")
+        return lines
+
+class Gauge:
+    # Read at scrape time from a callback, so it never goes stale.
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            logger.exception(f"Reading gauge {self.name} failed")
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        metric = Gauge(name, help, read)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+class RequestStats:
+    def __init__(self, path: str):
+        self.path = path
+        self.db_ops = 0
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        # Commands from one request can finish on several executor threads.
+        with self._lock:
+            self.db_ops += 1
+            self.db_seconds += seconds
+
+# Motor runs each command on an executor thread with a copy of the calling
+# context, so the listener sees the RequestStats of the request that issued it.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self, registry: MetricsRegistry, slow_ms: float = 100.0):
+        self.slow_ms = slow_ms
+        self.commands = registry.counter("cinebook_mongo_commands_total", "MongoDB commands by name and outcome", ("command", "outcome"))
+        self.duration = registry.histogram("cinebook_mongo_command_duration_seconds", "MongoDB command latency", ("command",))
+        self.slow = registry.counter("cinebook_mongo_slow_commands_total", "MongoDB commands slower than the slow-query threshold", ("command",))
+        self._pending: Dict[Tuple[int, object], dict] = {}
+
+    def started(self, event):
+        self._pending[(event.request_id, event.connection_id)] = event.command
+
+    def _finished(self, event, outcome: str):
+        command = self._pending.pop((event.request_id, event.connection_id), None)
+        seconds = event.duration_micros / 1_000_000
+        self.commands.inc((event.command_name, outcome))
+        self.duration.observe((event.command_name,), seconds)
+        stats = current_request.get()
+        if stats is not None:
+            stats.add(seconds)
+        if seconds * 1000 >= self.slow_ms:
+            self.slow.inc((event.command_name,))
+            target = command.get(event.command_name) if command else None
+            shape = {key: command[key] for key in ("filter", "sort", "pipeline", "updates", "deletes") if command and key in command}
+            logger.warning(
+                f"Slow MongoDB {event.command_name} on {target} took {seconds * 1000:.1f}ms"
+                f" (request {stats.path if stats else 'background'}): {str(shape)[:500]}"
+            )
+
+    def succeeded(self, event):
+        self._finished(event, "ok")
+
+    def failed(self, event):
+        self._finished(event, "error")
+
+class HttpMetrics:
+    def __init__(self, registry: MetricsRegistry):
+        self.requests = registry.counter("cinebook_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+        self.latency = registry.histogram("cinebook_http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+        self.db_ops = registry.histogram("cinebook_http_request_db_ops", "MongoDB commands issued per HTTP request", ("method", "route"), DB_OPS_BUCKETS)
+        self.db_time = registry.histogram("cinebook_http_request_db_seconds", "Time spent in MongoDB per HTTP request", ("method", "route"))
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        self.requests.inc((method, route, str(status)))
+        self.latency.observe((method, route), seconds)
+        self.db_ops.observe((method, route), stats.db_ops)
+        self.db_time.observe((method, route), stats.db_seconds)
+
+class MetricsMiddleware:
+    # Plain ASGI middleware so streaming responses pass straight through.
+    def __init__(self, app, metrics: HttpMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["path"])
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                timing = f'app;dur={elapsed:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_ops} ops"'
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            # Label by route template, not raw path, to keep cardinality bounded.
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            self.metrics.record(scope["method"], template, status, time.perf_counter() - started, stats)
@@ -0,0 +1,34 @@
+from pymongo import ReturnDocument
+
+# In-process stand-in for MongoDB, built on mongomock-motor (a dev
+# dependency), for the test suite and offline benchmark runs. Latencies it
+# produces say nothing about a real server; compare them only with numbers
+# recorded the same way.
+
+def patch_mongomock():
+    import mongomock.collection
+
+    collection = mongomock.collection.Collection
+    if getattr(collection, "_cinebook_patched", False):
+        return
+    find_one_and_update = collection.find_one_and_update
+
+    # mongomock re-runs the original filter to fetch the ReturnDocument.AFTER
+    # copy, so conditional updates that change the fields they match on (every
+    # seat claim) come back as None. Fetch the updated document by _id instead.
+    def find_one_and_update_after(self, filter, update, projection=None, sort=None, upsert=False, return_document=ReturnDocument.BEFORE, **kwargs):
+        if return_document != ReturnDocument.AFTER:
+            return find_one_and_update(self, filter, update, projection=projection, sort=sort, upsert=upsert, return_document=return_document, **kwargs)
+        before = find_one_and_update(self, filter, update, projection={"_id": 1}, sort=sort, upsert=upsert, return_document=ReturnDocument.BEFORE, **kwargs)
+        if before is None:
+            return self.find_one(filter, projection) if upsert else None
+        return self.find_one({"_id": before["_id"]}, projection)
+
+    collection.find_one_and_update = find_one_and_update_after
+    collection._cinebook_patched = True
+
+def memory_database(name: str):
+    from mongomock_motor import AsyncMongoMockClient
+
+    patch_mongomock()
+    return AsyncMongoMockClient()[name]
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+SortSpec = List[Tuple[str, int]]
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: SortSpec) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def normalize_cursor(cursor: Optional[str], sort: SortSpec) -> Optional[str]:
+    # Rejects malformed cursors and re-encodes valid ones canonically, so a
+    # cursor is safe to use as a cache key.
+    if not cursor:
+        return None
+    return encode_cursor(decode_cursor(cursor, sort))
+
+def keyset_filter(sort: SortSpec, values: list) -> dict:
+    # (a, b) > (x, y)  <=>  a > x  OR  (a == x AND b > y), honouring each key's direction.
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {sort[j][0]: values[j] for j in range(i)}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def fetch_page(collection, query: dict, sort: SortSpec, limit: int, after: Optional[str] = None, projection: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    if after:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(after, sort))]}
+    docs = await collection.find(query, projection or {"_id": 0}).sort(sort).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get(field) for field, _ in sort])
+    return docs, next_cursor
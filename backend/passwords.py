@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+class PasswordHasher:
+    # bcrypt releases the GIL while hashing, so a small thread pool runs it in
+    # parallel off the event loop. Requests beyond max_pending are refused
+    # with a 503 instead of queueing behind a login burst.
+    def __init__(self, context, workers: int = 4, max_pending: int = 64, retry_after: int = 1):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.work_seconds = 0.0
+
+    def _work(self, submitted: float, fn: Callable, *args) -> Any:
+        started = time.monotonic()
+        with self._lock:
+            self.in_flight += 1
+            self.wait_seconds += started - submitted
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.work_seconds += time.monotonic() - started
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-in requests, please retry shortly",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._work, time.monotonic(), fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "in_flight": self.in_flight,
+            "queued": max(self.pending - self.in_flight, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else None,
+            "avg_hash_ms": round(self.work_seconds / self.completed * 1000, 2) if self.completed else None
+        }
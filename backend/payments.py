@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from cache import TTLCache
+from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionRequest
+
+try:
+    import stripe
+    RETRYABLE_ERRORS: tuple = (asyncio.TimeoutError, ConnectionError, stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+except ImportError:
+    stripe = None
+    RETRYABLE_ERRORS = (asyncio.TimeoutError, ConnectionError)
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive provider failures and fails
+    # fast until `reset_timeout` has passed; then lets a single trial call
+    # through (half-open) and closes again if it succeeds.
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> int:
+        if self.opened_at is None:
+            return 0
+        return max(int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1, 1)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+class PaymentClient:
+    # Long-lived wrapper around StripeCheckout. Only idempotent reads are
+    # retried; creating a checkout session is attempted once so a timed-out
+    # request can never produce two sessions.
+    def __init__(self, api_key: Optional[str], timeout: float = 10.0, retries: int = 2, backoff: float = 0.25, breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._clients: Dict[str, StripeCheckout] = {}
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self.rejected = 0
+
+    def checkout(self, webhook_url: str = "") -> StripeCheckout:
+        client = self._clients.get(webhook_url)
+        if client is None:
+            client = self._clients[webhook_url] = StripeCheckout(api_key=self.api_key, webhook_url=webhook_url)
+        return client
+
+    async def _call(self, name: str, call: Callable[[], Awaitable[Any]], retries: int = 0) -> Any:
+        for attempt in range(retries + 1):
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Payment provider unavailable, please retry shortly",
+                    headers={"Retry-After": str(self.breaker.retry_after())}
+                )
+            self.calls += 1
+            try:
+                result = await asyncio.wait_for(call(), self.timeout)
+            except RETRYABLE_ERRORS as e:
+                self.failures += 1
+                self.breaker.record_failure()
+                logger.warning(f"Payment provider {name} failed (attempt {attempt + 1}/{retries + 1}): {e.__class__.__name__}")
+                if attempt == retries:
+                    raise HTTPException(status_code=504 if isinstance(e, asyncio.TimeoutError) else 502, detail="Payment provider did not respond")
+                self.retried += 1
+                # Full jitter keeps retries from a burst of requests apart.
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                continue
+            except Exception:
+                # The provider answered (e.g. an invalid request), so it is up.
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def create_checkout_session(self, webhook_url: str, request: CheckoutSessionRequest):
+        return await self._call("create_checkout_session", lambda: self.checkout(webhook_url).create_checkout_session(request))
+
+    async def get_checkout_status(self, session_id: str):
+        return await self._call("get_checkout_status", lambda: self.checkout().get_checkout_status(session_id), retries=self.retries)
+
+    async def handle_webhook(self, body: bytes, signature: Optional[str]):
+        # Signature checks are local work, so they bypass the breaker.
+        return await self.checkout().handle_webhook(body, signature)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.failures,
+                "times_opened": self.breaker.times_opened
+            }
+        }
+
+def create_payment_client() -> PaymentClient:
+    api_base = os.getenv("STRIPE_API_BASE")
+    if api_base:
+        if stripe is None:
+            raise RuntimeError("STRIPE_API_BASE requires the 'stripe' package")
+        stripe.api_base = api_base
+    return PaymentClient(
+        os.getenv("STRIPE_API_KEY"),
+        timeout=float(os.getenv("PAYMENT_TIMEOUT_SECONDS", "10")),
+        retries=int(os.getenv("PAYMENT_RETRIES", "2")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("PAYMENT_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("PAYMENT_BREAKER_RESET_SECONDS", "30"))
+        )
+    )
+
+class PaymentStatusTracker:
+    # Coalesces concurrent status checks per checkout session, remembers
+    # settled results, briefly remembers "still pending" so tight polling does
+    # not reach the provider, and lets callers wait for a session to settle.
+    def __init__(self, settled_ttl: float = 600.0, pending_ttl: float = 2.0, maxsize: int = 10000):
+        self.settled = TTLCache(maxsize=maxsize, ttl=settled_ttl)
+        self.pending = TTLCache(maxsize=maxsize, ttl=pending_ttl)
+        self.pending_ttl = pending_ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, list] = {}
+        self.loads = 0
+        self.coalesced = 0
+
+    async def check(self, session_id: str, load: Callable[[], Awaitable[dict]]) -> dict:
+        transaction = self.settled.get(session_id) or self.pending.get(session_id)
+        if transaction is not None:
+            return transaction
+        future = self._inflight.get(session_id)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        self.loads += 1
+        future = self._inflight[session_id] = asyncio.ensure_future(load())
+        try:
+            transaction = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(session_id, None)
+        if transaction["payment_status"] == "paid":
+            self.settled.set(session_id, transaction)
+        else:
+            self.pending.set(session_id, transaction)
+        return transaction
+
+    def settle(self, session_id: str):
+        self.pending.delete(session_id)
+        waiter = self._waiters.get(session_id)
+        if waiter:
+            waiter[0].set()
+
+    async def wait(self, session_id: str, timeout: float, load: Callable[[], Awaitable[dict]]) -> dict:
+        # Wakes on settle() (webhook or another worker's poll) and otherwise
+        # re-checks each time the pending entry lapses, until `timeout`.
+        deadline = time.monotonic() + timeout
+        waiter = self._waiters.setdefault(session_id, [asyncio.Event(), 0])
+        waiter[1] += 1
+        try:
+            transaction = await self.check(session_id, load)
+            while transaction["payment_status"] != "paid":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(waiter[0].wait(), min(remaining, self.pending_ttl))
+                except asyncio.TimeoutError:
+                    pass
+                waiter[0].clear()
+                transaction = await self.check(session_id, load)
+            return transaction
+        finally:
+            waiter[1] -= 1
+            if not waiter[1]:
+                self._waiters.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "waiting": sum(count for _, count in self._waiters.values()),
+            "settled_cache": self.settled.stats(),
+            "pending_cache": self.pending.stats()
+        }
@@ -0,0 +1,164 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from cache import TTLCache
+
+PROFILE_HEADER = b"x-profile"
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    # Statistical profiler: a background thread snapshots every thread's stack
+    # with sys._current_frames() at a fixed interval. Only one window runs at a
+    # time, and the cost while idle is zero.
+    def __init__(self, max_seconds: float = 60.0, min_interval: float = 0.001):
+        self.max_seconds = max_seconds
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self.windows = 0
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _sample(self, seconds: float, interval: float) -> Dict[str, Any]:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident) or str(ident))
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(interval)
+        return {"samples": samples, "stacks": stacks}
+
+    async def profile(self, seconds: float, interval: float) -> Dict[str, Any]:
+        if not 0 < seconds <= self.max_seconds:
+            raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {self.max_seconds:g}")
+        if interval < self.min_interval:
+            raise HTTPException(status_code=400, detail=f"interval must be at least {self.min_interval * 1000:g}ms")
+        if not self._lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A profiling window is already running")
+        try:
+            self.windows += 1
+            # A dedicated thread rather than the default executor, so the
+            # sampler never queues behind (or starves) Motor and bcrypt work.
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+
+            def run():
+                try:
+                    result = self._sample(seconds, interval)
+                except BaseException as e:
+                    loop.call_soon_threadsafe(future.set_exception, e)
+                else:
+                    loop.call_soon_threadsafe(future.set_result, result)
+
+            threading.Thread(target=run, name="sampling-profiler", daemon=True).start()
+            return await future
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        # Brendan Gregg's collapsed format, ready for flamegraph.pl or speedscope.
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+class RequestProfiler:
+    # Runs single requests under cProfile when they carry an `X-Profile` header
+    # and are authorized, keeping the stats for later retrieval by id. cProfile
+    # sees the whole event loop thread, so other requests interleaving with the
+    # profiled one show up too; only one request is profiled at a time.
+    def __init__(self, authorize: Callable[[str], Awaitable[bool]], keep: int = 50, ttl: float = 3600.0):
+        self.authorize = authorize
+        self.results = TTLCache(maxsize=keep, ttl=ttl)
+        self._active = False
+        self.profiled = 0
+        self.skipped = 0
+
+    async def should_profile(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER, b"").lower() not in (b"1", b"true", b"yes"):
+            return False
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token or not await self.authorize(token):
+            return False
+        if self._active:
+            self.skipped += 1
+            return False
+        return True
+
+    def get(self, profile_id: str, sort: str = "cumulative", limit: int = 60) -> Optional[str]:
+        result = self.results.get(profile_id)
+        if result is None:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(result["profile"], stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return f"{result['method']} {result['path']} -> {result['status']} in {result['seconds'] * 1000:.1f}ms\n{out.getvalue()}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profiled": self.profiled,
+            "skipped_busy": self.skipped,
+            "stored": self.results.stats()["size"]
+        }
+
+class ProfilingMiddleware:
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await self.profiler.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profile = cProfile.Profile()
+        self.profiler._active = True
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.disable()
+            self.profiler._active = False
+            self.profiler.profiled += 1
+            self.profiler.results.set(profile_id, {
+                "profile": profile,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "seconds": time.perf_counter() - started
+            })
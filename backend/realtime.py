@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from fastapi import WebSocket
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+class ClientConnection:
+    def __init__(self, websocket: WebSocket, show_id: str, queue_size: int):
+        self.websocket = websocket
+        self.show_id = show_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+
+class ConnectionManager:
+    def __init__(self, queue_size: int = 64, send_timeout: float = 5.0, history_size: int = 256, history_shows: int = 1000):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.history_size = history_size
+        self.history_shows = history_shows
+        self.active_connections: Dict[str, Set[ClientConnection]] = {}
+        self.history: "OrderedDict[str, Deque[Tuple[int, str]]]" = OrderedDict()
+        self.evicted = 0
+
+    async def connect(self, websocket: WebSocket, show_id: str) -> ClientConnection:
+        await websocket.accept()
+        connection = ClientConnection(websocket, show_id, self.queue_size)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        self.active_connections.setdefault(show_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: ClientConnection):
+        connections = self.active_connections.get(connection.show_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.active_connections[connection.show_id]
+        if connection.sender and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+
+    def _evict(self, connection: ClientConnection, reason: str):
+        if connection not in self.active_connections.get(connection.show_id, ()):
+            return
+        logger.info(f"Evicting websocket for show {connection.show_id}: {reason}")
+        self.evicted += 1
+        self.disconnect(connection)
+        asyncio.create_task(self._close(connection))
+
+    async def _close(self, connection: ClientConnection):
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _send_loop(self, connection: ClientConnection):
+        while True:
+            text = await connection.queue.get()
+            try:
+                await asyncio.wait_for(connection.websocket.send_text(text), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._evict(connection, "send timed out")
+                return
+            except Exception as e:
+                self._evict(connection, f"send failed ({e.__class__.__name__})")
+                return
+
+    def enqueue(self, connection: ClientConnection, text: str) -> bool:
+        try:
+            connection.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self._evict(connection, "send queue full")
+            return False
+
+    def _record(self, show_id: str, version: int, text: str):
+        history = self.history.get(show_id)
+        if history is None:
+            history = self.history[show_id] = deque(maxlen=self.history_size)
+            if len(self.history) > self.history_shows:
+                self.history.popitem(last=False)
+        else:
+            self.history.move_to_end(show_id)
+        history.append((version, text))
+
+    def replay(self, show_id: str, since: int) -> Optional[List[str]]:
+        # Returns the deltas after `since` in version order, or None when the
+        # ring buffer cannot prove it holds every one of them.
+        history = self.history.get(show_id)
+        if not history:
+            return None
+        entries = sorted(entry for entry in history if entry[0] > since)
+        if not entries:
+            return [] if max(version for version, _ in history) >= since else None
+        expected = since + 1
+        for version, _ in entries:
+            if version != expected:
+                return None
+            expected += 1
+        return [text for _, text in entries]
+
+    def reset(self, show_id: str, snapshot: Optional[str] = None) -> int:
+        # The show's seat map was rebuilt: buffered deltas name seats from the
+        # old layout, so drop them and hand every subscriber the new map.
+        self.history.pop(show_id, None)
+        if snapshot is None:
+            return 0
+        return sum(self.enqueue(connection, snapshot) for connection in list(self.active_connections.get(show_id, ())))
+
+    async def broadcast(self, show_id: str, message: dict) -> int:
+        text = json.dumps(message)
+        if message.get("version") is not None:
+            self._record(show_id, message["version"], text)
+        connections = self.active_connections.get(show_id)
+        if not connections:
+            return 0
+        # Serialise once; each client's sender task drains its own bounded queue,
+        # so a slow socket only ever delays (and eventually evicts) itself.
+        return sum(self.enqueue(connection, text) for connection in list(connections))
+
+    def connection_count(self, show_id: str) -> int:
+        return len(self.active_connections.get(show_id, ()))
+
+    def connection_counts(self) -> Dict[str, int]:
+        return {show_id: len(connections) for show_id, connections in self.active_connections.items()}
+
+    def queued_messages(self) -> int:
+        return sum(c.queue.qsize() for connections in self.active_connections.values() for c in connections)
+
+BroadcastHandler = Callable[[str, dict], Awaitable[None]]
+
+class BroadcastBackend(ABC):
+    def __init__(self):
+        self._handler: Optional[BroadcastHandler] = None
+
+    def subscribe(self, handler: BroadcastHandler):
+        self._handler = handler
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict):
+        pass
+
+    async def _deliver(self, channel: str, message: dict):
+        if self._handler is None:
+            return
+        try:
+            await self._handler(channel, message)
+        except Exception:
+            logger.exception(f"Broadcast handler failed for channel {channel}")
+
+class InMemoryBroadcast(BroadcastBackend):
+    async def publish(self, channel: str, message: dict):
+        await self._deliver(channel, message)
+
+class RedisBroadcast(BroadcastBackend):
+    def __init__(self, url: str, prefix: str = "cinebook"):
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("BROADCAST_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(f"{self._prefix}:*")
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        await self._close_pubsub()
+        await self._redis.close()
+
+    async def _close_pubsub(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+
+    async def _listen(self):
+        offset = len(self._prefix) + 1
+        while True:
+            # Resubscribe after a dropped connection; messages published
+            # while disconnected are lost, as with any Redis pub/sub client.
+            try:
+                if self._pubsub is None:
+                    self._pubsub = self._redis.pubsub()
+                    await self._pubsub.psubscribe(f"{self._prefix}:*")
+                async for item in self._pubsub.listen():
+                    if item["type"] != "pmessage":
+                        continue
+                    channel = item["channel"].decode()[offset:]
+                    await self._deliver(channel, json.loads(item["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis broadcast subscription failed")
+            await self._close_pubsub()
+            await asyncio.sleep(1)
+
+    async def publish(self, channel: str, message: dict):
+        await self._redis.publish(f"{self._prefix}:{channel}", json.dumps(message))
+
+class MongoBroadcast(BroadcastBackend):
+    # Tails a capped collection, so it works against a standalone mongod where
+    # change streams are unavailable.
+    def __init__(self, db, collection: str = "broadcast_events", max_documents: int = 10000):
+        super().__init__()
+        self._db = db
+        self._name = collection
+        self._max_documents = max_documents
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        try:
+            await self._db.create_collection(self._name, capped=True, size=max(self._max_documents * 1024, 4096), max=self._max_documents)
+        except CollectionInvalid:
+            pass
+        last = await self._db[self._name].find_one({}, sort=[("$natural", -1)])
+        newest, seen = None, set()
+        if last:
+            newest = last["_id"].generation_time
+            existing = await self._db[self._name].find({"_id": {"$gte": ObjectId.from_datetime(newest)}}, {"_id": 1}).to_list(None)
+            seen = {event["_id"] for event in existing}
+        self._task = asyncio.create_task(self._tail(newest, seen))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _tail(self, newest, seen: set):
+        # Each (re)opened cursor starts from the newest second already
+        # delivered rather than from a position in the collection, so it still
+        # resumes after the capped collection has wrapped. ObjectIds from
+        # different publishers are only ordered to the second, hence `seen`
+        # holds the ids delivered within that second to skip repeats.
+        collection = self._db[self._name]
+        while True:
+            query = {"_id": {"$gte": ObjectId.from_datetime(newest)}} if newest else {}
+            try:
+                cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        event_id = event["_id"]
+                        if event_id in seen:
+                            continue
+                        if newest is None or event_id.generation_time > newest:
+                            newest, seen = event_id.generation_time, set()
+                        seen.add(event_id)
+                        await self._deliver(event["channel"], event["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Broadcast tail cursor failed")
+            await asyncio.sleep(1)
+
+    async def publish(self, channel: str, message: dict):
+        await self._db[self._name].insert_one({"channel": channel, "message": message})
+
+def create_broadcast_backend(kind: str, db=None, redis_url: Optional[str] = None) -> BroadcastBackend:
+    if kind == "memory":
+        return InMemoryBroadcast()
+    if kind == "redis":
+        return RedisBroadcast(redis_url or "redis://localhost:6379")
+    if kind == "mongo":
+        return MongoBroadcast(db)
+    raise ValueError(f"Unknown broadcast backend: {kind}")
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+def to_minutes(clock: str) -> int:
+    hours, _, minutes = clock.partition(":")
+    if not (hours.isdigit() and minutes.isdigit()) or int(hours) > 23 or int(minutes) > 59:
+        raise ValueError(f"Invalid time '{clock}', expected HH:MM")
+    return int(hours) * 60 + int(minutes)
+
+def to_clock(minutes: int) -> str:
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def show_interval(show: dict) -> Tuple[int, int]:
+    # Absolute minutes since 0001-01-01, so shows on different days compare
+    # directly; an end at or before the start runs past midnight.
+    day = date.fromisoformat(show["date"]).toordinal() * MINUTES_PER_DAY
+    start = to_minutes(show["start_time"])
+    end = to_minutes(show["end_time"])
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return day + start, day + end
+
+def find_overlaps(shows: Iterable[dict]) -> List[Tuple[dict, dict]]:
+    # Sort-and-sweep per screen: after sorting by start, a show overlaps
+    # something earlier exactly when it starts before the latest end seen so
+    # far, so each show is compared once against that furthest-reaching show.
+    screens: Dict[Tuple[str, int], List[Tuple[int, int, dict]]] = {}
+    for show in shows:
+        start, end = show_interval(show)
+        screens.setdefault((show["theater_id"], show["screen_number"]), []).append((start, end, show))
+
+    overlaps = []
+    for intervals in screens.values():
+        intervals.sort(key=lambda interval: interval[:2])
+        reach, reaching = None, None
+        for start, end, show in intervals:
+            if reach is not None and start < reach:
+                overlaps.append((reaching, show))
+            if reach is None or end > reach:
+                reach, reaching = end, show
+    return overlaps
+
+def count_recurrence(start_date: str, end_date: str, start_times: List[str], weekdays: Optional[List[int]] = None) -> int:
+    # How many shows expand_recurrence would produce, without building them.
+    first = date.fromisoformat(start_date)
+    last = date.fromisoformat(end_date)
+    if last < first:
+        raise ValueError("end_date is before start_date")
+    days = (last - first).days + 1
+    if weekdays is not None:
+        weeks, extra = divmod(days, 7)
+        days = weeks * len(set(weekdays) & set(range(7))) + sum((first.weekday() + offset) % 7 in weekdays for offset in range(extra))
+    return days * len(start_times)
+
+def expand_recurrence(
+    movie_id: str,
+    theater_id: str,
+    screen_number: int,
+    price: float,
+    start_date: str,
+    end_date: str,
+    start_times: List[str],
+    duration_minutes: int,
+    weekdays: Optional[List[int]] = None
+) -> List[dict]:
+    # One show per start time on every day in [start_date, end_date] whose
+    # weekday (Monday=0) is in `weekdays`, or on every day when omitted.
+    first = date.fromisoformat(start_date)
+    last = date.fromisoformat(end_date)
+    if last < first:
+        raise ValueError("end_date is before start_date")
+    starts = [to_minutes(clock) for clock in start_times]
+
+    shows = []
+    day = first
+    while day <= last:
+        if weekdays is None or day.weekday() in weekdays:
+            for start in starts:
+                shows.append({
+                    "movie_id": movie_id,
+                    "theater_id": theater_id,
+                    "screen_number": screen_number,
+                    "start_time": to_clock(start),
+                    "end_time": to_clock(start + duration_minutes),
+                    "price": price,
+                    "date": day.isoformat()
+                })
+        day += timedelta(days=1)
+    return shows
+
+def schedule_window(shows: Iterable[dict]) -> Tuple[str, str]:
+    # Dates of existing shows that could overlap these, one day either side
+    # for shows that run past midnight.
+    dates = [show["date"] for show in shows]
+    return (date.fromisoformat(min(dates)) - timedelta(days=1)).isoformat(), (date.fromisoformat(max(dates)) + timedelta(days=1)).isoformat()
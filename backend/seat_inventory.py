@@ -0,0 +1,190 @@
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from cache import TTLCache
+
+SEAT_AVAILABLE = 0
+SEAT_BOOKED = 1
+
+ACTIVE_BOOKING_STATUSES = ["confirmed", "pending"]
+
+def find_screen(theater: Optional[dict], screen_number: int) -> Optional[dict]:
+    if not theater:
+        return None
+    return next((s for s in theater["screens"] if s["screen_number"] == screen_number), None)
+
+def seat_index(inventory: dict, seat_number: str) -> Optional[int]:
+    row = seat_number.rstrip("0123456789")
+    column = seat_number[len(row):]
+    if not column or row not in inventory["rows"]:
+        return None
+    column = int(column)
+    if column < 1 or column > inventory["seats_per_row"]:
+        return None
+    return inventory["rows"].index(row) * inventory["seats_per_row"] + column - 1
+
+def seat_label(inventory: dict, index: int) -> str:
+    row, column = divmod(index, inventory["seats_per_row"])
+    return f"{inventory['rows'][row]}{column + 1}"
+
+def build_inventory(show: dict, screen: dict, booked_seats: List[str]) -> dict:
+    seat_layout = screen["seat_layout"]
+    inventory = {
+        "show_id": show["id"],
+        "rows": seat_layout["rows"],
+        "seats_per_row": seat_layout["seats_per_row"],
+        "version": 0,
+        "seats": [SEAT_AVAILABLE] * (len(seat_layout["rows"]) * seat_layout["seats_per_row"])
+    }
+    for seat_number in booked_seats:
+        index = seat_index(inventory, seat_number)
+        if index is not None:
+            inventory["seats"][index] = SEAT_BOOKED
+    return inventory
+
+async def inventory_from_bookings(db, show: dict) -> Optional[dict]:
+    theater = await db.theaters.find_one({"id": show["theater_id"]}, {"_id": 0})
+    screen = find_screen(theater, show["screen_number"])
+    if not screen:
+        return None
+
+    bookings = await db.bookings.find(
+        {"show_id": show["id"], "status": {"$in": ACTIVE_BOOKING_STATUSES}},
+        {"_id": 0, "seats": 1}
+    ).to_list(None)
+    return build_inventory(show, screen, [seat for booking in bookings for seat in booking["seats"]])
+
+async def load_seat_inventory(db, show: dict) -> Optional[dict]:
+    inventory = await db.seat_inventory.find_one({"show_id": show["id"]}, {"_id": 0})
+    if inventory:
+        return inventory
+
+    # First access for this show: backfill once from existing bookings, after
+    # which the inventory document is the only thing seat lookups touch.
+    inventory = await inventory_from_bookings(db, show)
+    if not inventory:
+        return None
+    on_insert = {k: v for k, v in inventory.items() if k != "show_id"}
+    result = await db.seat_inventory.update_one({"show_id": show["id"]}, {"$setOnInsert": on_insert}, upsert=True)
+    if result.upserted_id is not None:
+        return inventory
+    return await db.seat_inventory.find_one({"show_id": show["id"]}, {"_id": 0})
+
+def render_seat_map(inventory: dict) -> List[List[dict]]:
+    seats_per_row = inventory["seats_per_row"]
+    states = inventory["seats"]
+    seats = []
+    for r, row in enumerate(inventory["rows"]):
+        offset = r * seats_per_row
+        seats.append([
+            {"seat_number": f"{row}{i+1}", "status": "booked" if states[offset + i] else "available"}
+            for i in range(seats_per_row)
+        ])
+    return seats
+
+async def mark_seats(db, show_id: str, indices: List[int], state: int) -> Optional[int]:
+    if not indices:
+        return None
+    inventory = await db.seat_inventory.find_one_and_update(
+        {"show_id": show_id},
+        {"$set": {f"seats.{i}": state for i in indices}, "$inc": {"version": 1}},
+        projection={"_id": 0, "version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return inventory["version"] if inventory else None
+
+# Bounded, and expiring so a worker that missed a layout invalidation still
+# converges on the current layout.
+_seat_layouts = TTLCache(maxsize=10000, ttl=3600)
+
+async def get_seat_layout(db, show: dict) -> Optional[dict]:
+    layout = _seat_layouts.get(show["id"])
+    if layout is None:
+        inventory = await load_seat_inventory(db, show)
+        if not inventory:
+            return None
+        layout = {"rows": inventory["rows"], "seats_per_row": inventory["seats_per_row"]}
+        _seat_layouts.set(show["id"], layout)
+    return layout
+
+def forget_seat_layout(show_id: str):
+    _seat_layouts.delete(show_id)
+
+async def reset_seat_inventory(db, show_ids: List[str]):
+    # Rebuilds each show's inventory in place from its current screen layout
+    # and active bookings. The version keeps counting up, so clients never see
+    # it go backwards; claims index into the old layout and are dropped.
+    # Inventories of shows (or screens) that no longer exist are deleted.
+    shows = await db.shows.find({"id": {"$in": show_ids}}, {"_id": 0}).to_list(None)
+    gone = set(show_ids)
+    for show in shows:
+        inventory = await inventory_from_bookings(db, show)
+        if not inventory:
+            continue
+        gone.discard(show["id"])
+        await db.seat_inventory.update_one(
+            {"show_id": show["id"]},
+            {
+                "$set": {"rows": inventory["rows"], "seats_per_row": inventory["seats_per_row"], "seats": inventory["seats"], "claims": []},
+                "$inc": {"version": 1}
+            },
+            upsert=True
+        )
+    if gone:
+        await db.seat_inventory.delete_many({"show_id": {"$in": list(gone)}})
+    for show_id in show_ids:
+        forget_seat_layout(show_id)
+
+async def claim_seats(db, show_id: str, indices: List[int], booking_id: str, hold_expires_at: str) -> Optional[int]:
+    # A single conditional update: it only matches while every requested seat
+    # is still available, so concurrent claims on any worker cannot overlap.
+    # The claim records its booking and hold expiry alongside the seats, so if
+    # the booking is never written the seats can still be traced and freed.
+    # Returns the inventory version the claim produced, or None on conflict.
+    query = {"show_id": show_id}
+    query.update({f"seats.{i}": SEAT_AVAILABLE for i in indices})
+    inventory = await db.seat_inventory.find_one_and_update(
+        query,
+        {
+            "$set": {f"seats.{i}": SEAT_BOOKED for i in indices},
+            "$inc": {"version": 1},
+            "$push": {"claims": {"booking_id": booking_id, "seats": indices, "hold_expires_at": hold_expires_at}}
+        },
+        projection={"_id": 0, "version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return inventory["version"] if inventory else None
+
+async def find_expired_claims(db, now: str, limit: int) -> List[dict]:
+    inventories = await db.seat_inventory.find(
+        {"claims.hold_expires_at": {"$lt": now}},
+        {"_id": 0, "show_id": 1, "rows": 1, "seats_per_row": 1, "claims": 1}
+    ).limit(limit).to_list(limit)
+    return [
+        {**claim, "show_id": inventory["show_id"], "seat_numbers": [seat_label(inventory, i) for i in claim["seats"]]}
+        for inventory in inventories
+        for claim in inventory["claims"]
+        if claim["hold_expires_at"] < now
+    ]
+
+async def settle_claim(db, show_id: str, booking_id: str, release_indices: Optional[List[int]] = None) -> Optional[int]:
+    # Drops a claim record, freeing its seats too when `release_indices` is
+    # given. Matching on the claim makes this safe to race with another worker.
+    update = {"$pull": {"claims": {"booking_id": booking_id}}}
+    if release_indices:
+        update["$set"] = {f"seats.{i}": SEAT_AVAILABLE for i in release_indices}
+        update["$inc"] = {"version": 1}
+    inventory = await db.seat_inventory.find_one_and_update(
+        {"show_id": show_id, "claims.booking_id": booking_id},
+        update,
+        projection={"_id": 0, "version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return inventory["version"] if inventory and release_indices else None
+
+async def release_seats(db, show: dict, seat_numbers: List[str]) -> Optional[int]:
+    layout = await get_seat_layout(db, show)
+    if not layout:
+        return None
+    indices = [seat_index(layout, seat) for seat in seat_numbers]
+    return await mark_seats(db, show["id"], [i for i in indices if i is not None], SEAT_AVAILABLE)
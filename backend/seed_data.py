@@ -3,9 +3,16 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+import random
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
+from typing import Dict, List
 from passlib.context import CryptContext
+from analytics import rebuild_rollups
+from scheduling import expand_recurrence, find_overlaps
+from seat_inventory import build_inventory
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -26,6 +33,8 @@ async def seed_database():
     await db.shows.delete_many({})
     await db.bookings.delete_many({})
     await db.payment_transactions.delete_many({})
+    await db.seat_inventory.delete_many({})
+    await db.analytics_rollups.delete_many({})
     
     print("Creating admin user...")
     admin_user = {
@@ -156,39 +165,32 @@ async def seed_database():
     print("Creating shows...")
     shows = []
     today = datetime.now(timezone.utc).date()
+    last_day = today + timedelta(days=6)
     
-    for i in range(7):
-        show_date = (today + timedelta(days=i)).isoformat()
-        
-        for movie in movies[:2]:
-            for theater in theaters:
-                shows.append({
-                    "id": str(uuid.uuid4()),
-                    "movie_id": movie["id"],
-                    "theater_id": theater["id"],
-                    "screen_number": 1,
-                    "start_time": "14:00",
-                    "end_time": "16:30",
-                    "price": 12.50,
-                    "date": show_date,
-                    "created_at": datetime.now(timezone.utc).isoformat()
-                })
-                
-                shows.append({
-                    "id": str(uuid.uuid4()),
-                    "movie_id": movie["id"],
-                    "theater_id": theater["id"],
-                    "screen_number": 1,
-                    "start_time": "18:00",
-                    "end_time": "20:30",
-                    "price": 15.00,
-                    "date": show_date,
-                    "created_at": datetime.now(timezone.utc).isoformat()
-                })
+    # (matinee, evening) start times; a movie that has to share a screen with
+    # the one before it gets the early/late slots instead.
+    slots = [("14:00", "18:00"), ("11:00", "21:00")]
+    
+    for theater in theaters:
+        for i, movie in enumerate(movies[:2]):
+            screen_number = theater["screens"][i % len(theater["screens"])]["screen_number"]
+            matinee, evening = slots[i // len(theater["screens"]) % len(slots)]
+            for start_time, price in ((matinee, 12.50), (evening, 15.00)):
+                shows += expand_recurrence(
+                    movie["id"], theater["id"], screen_number, price,
+                    today.isoformat(), last_day.isoformat(), [start_time], duration_minutes=150
+                )
+    
+    for show in shows:
+        show["id"] = str(uuid.uuid4())
+        show["created_at"] = datetime.now(timezone.utc).isoformat()
+    assert not find_overlaps(shows), "seed schedule has overlapping shows"
     
     await db.shows.insert_many(shows)
     print(f"Created {len(shows)} shows")
     
+    await rebuild_rollups(db)
+    
     print("\n=== Seed Data Summary ===")
     print(f"Admin: admin@cinebook.com / admin123")
     print(f"User: user@test.com / password123")
@@ -199,5 +201,296 @@ async def seed_database():
     
     client.close()
 
+SYNTHETIC_PASSWORD = "synthetic-password"
+SYNTHETIC_ADMIN_EMAIL = "admin@synthetic.example.com"
+SYNTHETIC_COLLECTIONS = ("users", "movies", "theaters", "shows", "bookings", "payment_transactions", "seat_inventory", "analytics_rollups", "webhook_events")
+
+def synthetic_user_email(i: int) -> str:
+    return f"user{i}@synthetic.example.com"
+
+def synthetic_user_id(i: int) -> str:
+    # Derived from the index so bookings can reference any user without
+    # keeping millions of ids in memory.
+    return str(uuid.UUID(int=(0x5EED << 96) + i))
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+class Progress:
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self.started = time.monotonic()
+        self.reported = self.started
+
+    def add(self, collection: str, count: int):
+        self.counts[collection] = self.counts.get(collection, 0) + count
+        if time.monotonic() - self.reported >= self.interval:
+            self.report()
+
+    def report(self):
+        self.reported = time.monotonic()
+        total = sum(self.counts.values())
+        elapsed = self.reported - self.started
+        detail = ", ".join(f"{collection}={count:,}" for collection, count in self.counts.items())
+        print(f"  {total:,} docs in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} docs/s) [{detail}]", flush=True)
+
+class BulkInserter:
+    # Buffers documents per collection and writes them with unordered
+    # insert_many batches, keeping up to `concurrency` batches in flight.
+    # Waiting for a free slot before queueing a batch keeps memory bounded.
+    def __init__(self, db, batch_size: int, concurrency: int, progress: Progress):
+        self.db = db
+        self.batch_size = batch_size
+        self.progress = progress
+        self.slots = asyncio.Semaphore(concurrency)
+        self.buffers: Dict[str, list] = {}
+        self.tasks: set = set()
+
+    async def add(self, collection: str, doc: dict):
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            await self.flush(collection)
+
+    async def flush(self, collection: str):
+        docs = self.buffers.pop(collection, [])
+        if not docs:
+            return
+        await self.slots.acquire()
+        for task in [t for t in self.tasks if t.done()]:
+            self.tasks.discard(task)
+            task.result()
+        task = asyncio.create_task(self._insert(collection, docs))
+        self.tasks.add(task)
+
+    async def _insert(self, collection: str, docs: list):
+        try:
+            await self.db[collection].insert_many(docs, ordered=False)
+            self.progress.add(collection, len(docs))
+        finally:
+            self.slots.release()
+
+    async def close(self):
+        for collection in list(self.buffers):
+            await self.flush(collection)
+        await asyncio.gather(*self.tasks)
+
+async def seed_synthetic(
+    db,
+    theaters: int = 5,
+    screens_per_theater: int = 4,
+    days: int = 7,
+    shows_per_screen: int = 4,
+    fill_ratio: float = 0.3,
+    users: int = 200,
+    movies: int = 10,
+    rows: int = 10,
+    seats_per_row: int = 20,
+    seed: int = 42,
+    batch_size: int = 5000,
+    concurrency: int = 8,
+    hash_workers: int = 0,
+    progress_interval: float = 2.0
+) -> dict:
+    # Scalable synthetic catalogue for benchmarks and capacity tests. Data is
+    # deterministic for a given seed, and seat inventories and analytics
+    # rollups match the generated bookings so no request pays for a
+    # first-access backfill. Shows and their bookings are generated and
+    # streamed out one screen at a time, so memory stays flat at any scale.
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    
+    def next_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    
+    # Dropping beats delete_many at this scale; the app recreates its
+    # indexes on startup.
+    for collection in SYNTHETIC_COLLECTIONS:
+        await db[collection].drop()
+    
+    progress = Progress(progress_interval)
+    inserter = BulkInserter(db, batch_size, concurrency, progress)
+    
+    # bcrypt is deliberately slow (~0.25s a hash), so by default every account
+    # shares one precomputed hash. With hash_workers, each user gets a unique
+    # password ("<password>-<n>") hashed across a process pool.
+    shared_hash = pwd_context.hash(SYNTHETIC_PASSWORD)
+    admin_id = next_id()
+    await inserter.add("users", {
+        "id": admin_id,
+        "email": SYNTHETIC_ADMIN_EMAIL,
+        "name": "Synthetic Admin",
+        "password_hash": shared_hash,
+        "role": "admin",
+        "created_at": now.isoformat()
+    })
+    pool = ProcessPoolExecutor(max_workers=hash_workers) if hash_workers else None
+    try:
+        loop = asyncio.get_running_loop()
+        for first in range(0, users, batch_size):
+            chunk = range(first, min(first + batch_size, users))
+            if pool:
+                passwords = [f"{SYNTHETIC_PASSWORD}-{i}" for i in chunk]
+                step = max(len(passwords) // hash_workers, 1)
+                parts = await asyncio.gather(*[
+                    loop.run_in_executor(pool, hash_passwords, passwords[j:j + step])
+                    for j in range(0, len(passwords), step)
+                ])
+                hashes = [h for part in parts for h in part]
+            else:
+                hashes = [shared_hash] * len(chunk)
+            for i, password_hash in zip(chunk, hashes):
+                await inserter.add("users", {
+                    "id": synthetic_user_id(i),
+                    "email": synthetic_user_email(i),
+                    "name": f"Synthetic User {i}",
+                    "password_hash": password_hash,
+                    "role": "user",
+                    "created_at": now.isoformat()
+                })
+    finally:
+        if pool:
+            pool.shutdown()
+    
+    movie_ids = []
+    for i in range(movies):
+        movie_ids.append(next_id())
+        await inserter.add("movies", {
+            "id": movie_ids[-1],
+            "title": f"Synthetic Movie {i}",
+            "description": "Generated for benchmarking.",
+            "genre": rng.choice(["Action", "Drama", "Sci-Fi", "Comedy", "Thriller"]),
+            "duration": rng.randint(90, 150),
+            "rating": rng.choice(["G", "PG", "PG-13", "R"]),
+            "poster_url": "",
+            "backdrop_url": "",
+            "release_date": (today - timedelta(days=rng.randint(0, 90))).isoformat(),
+            "created_at": (now - timedelta(seconds=movies - i)).isoformat()
+        })
+    
+    screen = {
+        "total_seats": rows * seats_per_row,
+        "seat_layout": {"rows": [chr(ord("A") + r) for r in range(rows)], "seats_per_row": seats_per_row}
+    }
+    seat_numbers = [f"{row}{n}" for row in screen["seat_layout"]["rows"] for n in range(1, seats_per_row + 1)]
+    seats_per_show = int(len(seat_numbers) * fill_ratio)
+    # Back-to-back 3-hour slots from 10:00 (at most four a day) keep every
+    # screen conflict-free.
+    start_times = [f"{10 + 3 * slot:02d}:00" for slot in range(min(shows_per_screen, 4))]
+    show_ids = []
+    
+    for t in range(theaters):
+        theater_id = next_id()
+        await inserter.add("theaters", {
+            "id": theater_id,
+            "name": f"Synthetic Theater {t}",
+            "location": f"District {t}",
+            "screens": [{"screen_number": n + 1, **screen} for n in range(screens_per_theater)],
+            "created_at": (now - timedelta(seconds=theaters - t)).isoformat()
+        })
+        for screen_number in range(1, screens_per_theater + 1):
+            shows = expand_recurrence(
+                rng.choice(movie_ids), theater_id, screen_number, rng.choice([10.0, 12.5, 15.0]),
+                today.isoformat(), (today + timedelta(days=days - 1)).isoformat(), start_times, duration_minutes=170
+            )
+            for show in shows:
+                show["id"] = next_id()
+                show["created_at"] = now.isoformat()
+                show_ids.append(show["id"])
+                await inserter.add("shows", show)
+                
+                sold = rng.sample(seat_numbers, seats_per_show)
+                held = []
+                while sold:
+                    seats = sold[:rng.randint(1, 4)]
+                    sold = sold[len(seats):]
+                    status = rng.choices(["confirmed", "pending", "cancelled"], weights=[85, 5, 10])[0]
+                    if status != "cancelled":
+                        held += seats
+                    await inserter.add("bookings", {
+                        "id": next_id(),
+                        "user_id": synthetic_user_id(rng.randrange(users)) if users else admin_id,
+                        "show_id": show["id"],
+                        "seats": seats,
+                        "total_amount": show["price"] * len(seats),
+                        "status": status,
+                        "booking_time": (now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))).isoformat(),
+                        "hold_expires_at": (now + timedelta(days=1)).isoformat() if status == "pending" else None,
+                        "payment_session_id": None
+                    })
+                await inserter.add("seat_inventory", build_inventory(show, screen, held))
+    
+    await inserter.close()
+    progress.report()
+    print("Rebuilding analytics rollups...", flush=True)
+    await rebuild_rollups(db)
+    
+    return {
+        "admin_email": SYNTHETIC_ADMIN_EMAIL,
+        "password": SYNTHETIC_PASSWORD,
+        "users": users,
+        "show_ids": show_ids,
+        "seat_numbers": seat_numbers,
+        "counts": progress.counts
+    }
+
+async def seed_synthetic_database(args):
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[args.db_name or db_name]
+    started = time.monotonic()
+    print(f"Seeding synthetic data into {db.name}...")
+    seeded = await seed_synthetic(
+        db,
+        theaters=args.theaters,
+        screens_per_theater=args.screens,
+        days=args.days,
+        shows_per_screen=args.shows_per_screen,
+        fill_ratio=args.fill_ratio,
+        users=args.users,
+        movies=args.movies,
+        rows=args.rows,
+        seats_per_row=args.seats_per_row,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        hash_workers=args.hash_workers
+    )
+    
+    print("\n=== Synthetic Seed Summary ===")
+    for collection, count in seeded["counts"].items():
+        print(f"{collection}: {count:,}")
+    print(f"Admin: {seeded['admin_email']} / {seeded['password']}")
+    password = f"{seeded['password']}-<n>" if args.hash_workers else seeded["password"]
+    print(f"Users: {synthetic_user_email(0)} ... / {password}")
+    print(f"Took {time.monotonic() - started:.1f}s")
+    print("==============================\n")
+    
+    client.close()
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed the database with demo data, or with synthetic data at scale")
+    parser.add_argument("--synthetic", action="store_true", help="generate a synthetic dataset instead of the demo data")
+    parser.add_argument("--db-name", help="database to seed (defaults to DB_NAME)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--movies", type=int, default=20)
+    parser.add_argument("--theaters", type=int, default=10)
+    parser.add_argument("--screens", type=int, default=5, help="screens per theater")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--shows-per-screen", type=int, default=4, help="shows per screen per day (max 4)")
+    parser.add_argument("--fill-ratio", type=float, default=0.3, help="fraction of each show's seats that are booked")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats-per-row", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many")
+    parser.add_argument("--concurrency", type=int, default=8, help="insert_many batches in flight")
+    parser.add_argument("--hash-workers", type=int, default=0, help="hash a unique password per user across this many processes")
+    args = parser.parse_args()
+    
+    if args.synthetic:
+        asyncio.run(seed_synthetic_database(args))
+    else:
+        asyncio.run(seed_database())
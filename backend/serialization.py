@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Optional, Type
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content)
+
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    # Mongo hands back exactly the model's fields, which is all that
+    # validating with extra="ignore" would have done to a trusted document.
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+class ResponseEncoder:
+    # Documents read back from Mongo were validated on the way in, so read
+    # endpoints serialise them straight to JSON with orjson instead of
+    # re-validating each item and walking it with jsonable_encoder. With
+    # `strict` on, responses go through the models and FastAPI's encoder
+    # again, which surfaces stored documents that have drifted from the schema.
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+
+    def documents(self, model: Type[BaseModel], docs: List[dict]) -> List[dict]:
+        if self.strict:
+            return [model(**doc).model_dump() for doc in docs]
+        return docs
+
+    def document(self, model: Type[BaseModel], doc: dict) -> dict:
+        # Single cached documents are stored whole, so keep just the model's
+        # fields, as the projection does for lists.
+        if self.strict:
+            return model(**doc).model_dump()
+        return {name: doc[name] for name in model.model_fields if name in doc}
+
+    def response(self, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+        if self.strict:
+            return JSONResponse(jsonable_encoder(content), headers=headers)
+        return ORJSONResponse(content, headers=headers)
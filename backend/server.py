@@ -1,25 +1,48 @@
-from fastapi import FastAPI, APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends, Request
+from fastapi import FastAPI, APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends, Request, Response, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 from passlib.context import CryptContext
-from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
+from emergentintegrations.payments.stripe.checkout import CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 import asyncio
+import csv
+import time
+from contextlib import asynccontextmanager
+import io
+import json
+from analytics import booking_time_match, compute_analytics, ensure_rollups, read_rollups, rebuild_rollups, rollups_built, rollup_ops, apply_rollup_ops
+from cache import CatalogCache, PrecomputedBody, TTLCache
+from indexes import ensure_indexes, check_query_plans, explain_query_shapes
+from metrics import CommandMetrics, HttpMetrics, MetricsMiddleware, MetricsRegistry
+from pagination import fetch_page, normalize_cursor
+from profiler import ProfilingMiddleware, RequestProfiler, SamplingProfiler
+from passwords import PasswordHasher
+from payments import PaymentStatusTracker, create_payment_client
+from realtime import ConnectionManager, create_broadcast_backend
+from scheduling import count_recurrence, expand_recurrence, find_overlaps, schedule_window, show_interval
+from serialization import ResponseEncoder, model_projection
+from seat_inventory import SEAT_AVAILABLE, ACTIVE_BOOKING_STATUSES, load_seat_inventory, seat_index, render_seat_map, get_seat_layout, forget_seat_layout, reset_seat_inventory, claim_seats, find_expired_claims, settle_claim, release_seats
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+metrics_registry = MetricsRegistry()
+command_metrics = CommandMetrics(metrics_registry, slow_ms=float(os.getenv("SLOW_QUERY_MS", "100")))
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[command_metrics])
 db = client[os.environ['DB_NAME']]
 
 app = FastAPI()
@@ -27,40 +50,109 @@ api_router = APIRouter(prefix="/api")
 
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+)
 
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-    
-    async def connect(self, websocket: WebSocket, show_id: str):
-        await websocket.accept()
-        if show_id not in self.active_connections:
-            self.active_connections[show_id] = []
-        self.active_connections[show_id].append(websocket)
-    
-    def disconnect(self, websocket: WebSocket, show_id: str):
-        if show_id in self.active_connections:
-            self.active_connections[show_id].remove(websocket)
-    
-    async def broadcast(self, show_id: str, message: dict):
-        if show_id in self.active_connections:
-            for connection in self.active_connections[show_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
+# db: look the user up on every request; cache: short-TTL principal cache in
+# front of that lookup; claims: trust the signed token claims outright.
+# Changes made through the API call invalidate_principal, so they apply on the
+# next request. Edits made directly in Mongo are seen within
+# AUTH_CACHE_TTL_SECONDS (30s by default) in cache mode, and only once the
+# token is reissued (up to ACCESS_TOKEN_EXPIRE_HOURS) in claims mode.
+AUTH_MODE = os.getenv("AUTH_MODE", "cache")
+PRINCIPAL_CLAIMS = ("email", "name", "role")
+
+SEAT_HOLD_MINUTES = int(os.getenv("SEAT_HOLD_MINUTES", "15"))
+HOLD_SWEEP_INTERVAL_SECONDS = int(os.getenv("HOLD_SWEEP_INTERVAL_SECONDS", "30"))
+HOLD_SWEEP_BATCH_SIZE = int(os.getenv("HOLD_SWEEP_BATCH_SIZE", "500"))
+
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_LEASE_SECONDS = int(os.getenv("WEBHOOK_LEASE_SECONDS", "60"))
+WEBHOOK_POLL_INTERVAL_SECONDS = int(os.getenv("WEBHOOK_POLL_INTERVAL_SECONDS", "5"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "10"))
+
+manager = ConnectionManager(
+    queue_size=int(os.getenv("WS_SEND_QUEUE_SIZE", "64")),
+    send_timeout=float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5")),
+    history_size=int(os.getenv("WS_HISTORY_SIZE", "256"))
+)
+broadcaster = create_broadcast_backend(os.getenv("BROADCAST_BACKEND", "memory"), db=db, redis_url=os.getenv("REDIS_URL"))
+
+payment_client = create_payment_client()
+payment_status = PaymentStatusTracker(
+    settled_ttl=float(os.getenv("PAYMENT_STATUS_CACHE_SECONDS", "600")),
+    pending_ttl=float(os.getenv("PAYMENT_STATUS_PENDING_SECONDS", "2"))
+)
+PAYMENT_STATUS_MAX_WAIT_SECONDS = float(os.getenv("PAYMENT_STATUS_MAX_WAIT_SECONDS", "25"))
+
+catalog = CatalogCache(
+    db,
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "60")),
+    body_maxsize=int(os.getenv("CATALOG_BODY_CACHE_SIZE", "1000"))
+)
+
+principals = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+)
+auth_stats = {"claims_only": 0, "db_lookups": 0}
+
+async def handle_broadcast(channel: str, message: dict):
+    if channel.startswith("seats:"):
+        await manager.broadcast(channel[len("seats:"):], message)
+    elif channel == "catalog":
+        catalog.invalidate(message["collection"], message.get("id"))
+    elif channel == "seat_layouts":
+        for show_id in message["show_ids"]:
+            forget_seat_layout(show_id)
+            manager.reset(show_id, await seat_snapshot(show_id) if manager.connection_count(show_id) else None)
+    elif channel == "principals":
+        principals.delete(message["user_id"])
+    elif channel == "payments":
+        payment_status.settle(message["session_id"])
+
+broadcaster.subscribe(handle_broadcast)
+
+async def invalidate_catalog(collection: str, entity_id: Optional[str] = None):
+    # Drop it locally right away, then tell the other workers.
+    catalog.invalidate(collection, entity_id)
+    await broadcaster.publish("catalog", {"collection": collection, "id": entity_id})
 
-manager = ConnectionManager()
+async def reset_seat_layouts(show_ids: List[str]):
+    # After a show moves screen or a screen's layout changes; every worker
+    # drops its cached layout so seat numbers are checked against the new one.
+    if not show_ids:
+        return
+    await reset_seat_inventory(db, show_ids)
+    await broadcaster.publish("seat_layouts", {"show_ids": show_ids})
+
+async def invalidate_principal(user_id: str):
+    # Call after changing a user's role or profile; claims-only tokens keep
+    # their old claims until they expire.
+    principals.delete(user_id)
+    await broadcaster.publish("principals", {"user_id": user_id})
+
+async def publish_seat_update(show_id: str, seats: List[str], status: str, version: Optional[int]):
+    await broadcaster.publish(f"seats:{show_id}", {
+        "type": "seat_update",
+        "seats": seats,
+        "status": status,
+        "version": version
+    })
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -76,9 +168,19 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        if AUTH_MODE == "claims" and all(field in payload for field in PRINCIPAL_CLAIMS):
+            auth_stats["claims_only"] += 1
+            return {"id": user_id, **{field: payload[field] for field in PRINCIPAL_CLAIMS}}
+        if AUTH_MODE != "db":
+            user = principals.get(user_id)
+            if user is not None:
+                return user
+        auth_stats["db_lookups"] += 1
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
+        if AUTH_MODE != "db":
+            principals.set(user_id, user)
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -94,6 +196,9 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class UserRoleUpdate(BaseModel):
+    role: str = Field(pattern="^(user|admin)$")
+
 class UserResponse(BaseModel):
     id: str
     email: str
@@ -113,6 +218,17 @@ class Movie(BaseModel):
     release_date: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+class MovieSummary(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    title: str
+    genre: str
+    duration: int
+    rating: str
+    poster_url: str
+    release_date: str
+    created_at: Optional[str] = None
+
 class MovieCreate(BaseModel):
     title: str
     description: str
@@ -131,6 +247,13 @@ class Theater(BaseModel):
     screens: List[dict]
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+class TheaterSummary(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+    location: str
+    created_at: Optional[str] = None
+
 class TheaterCreate(BaseModel):
     name: str
     location: str
@@ -157,6 +280,21 @@ class ShowCreate(BaseModel):
     price: float
     date: str
 
+class ShowRecurrence(BaseModel):
+    movie_id: str
+    theater_id: str
+    screen_number: int
+    price: float
+    start_date: str
+    end_date: str
+    start_times: List[str]
+    duration_minutes: Optional[int] = None
+    weekdays: Optional[List[int]] = None
+
+class ShowSchedule(BaseModel):
+    shows: List[ShowCreate] = []
+    recurrences: List[ShowRecurrence] = []
+
 class BookingCreate(BaseModel):
     show_id: str
     seats: List[str]
@@ -170,6 +308,7 @@ class Booking(BaseModel):
     total_amount: float
     status: str
     booking_time: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    hold_expires_at: Optional[str] = None
     payment_session_id: Optional[str] = None
 
 @api_router.post("/auth/register")
@@ -178,7 +317,7 @@ async def register(user: UserRegister):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     new_user = {
         "id": str(uuid.uuid4()),
         "email": user.email,
@@ -188,9 +327,12 @@ async def register(user: UserRegister):
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.users.insert_one(new_user)
+    try:
+        await db.users.insert_one(new_user)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
-    access_token = create_access_token({"sub": new_user["id"], "role": new_user["role"]})
+    access_token = create_access_token({"sub": new_user["id"], "email": new_user["email"], "name": new_user["name"], "role": new_user["role"]})
     
     return {
         "access_token": access_token,
@@ -201,10 +343,10 @@ async def register(user: UserRegister):
 @api_router.post("/auth/login")
 async def login(user: UserLogin):
     db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password_hash"]):
+    if not db_user or not await verify_password(user.password, db_user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    access_token = create_access_token({"sub": db_user["id"], "role": db_user["role"]})
+    access_token = create_access_token({"sub": db_user["id"], "email": db_user["email"], "name": db_user["name"], "role": db_user["role"]})
     
     return {
         "access_token": access_token,
@@ -216,32 +358,97 @@ async def login(user: UserLogin):
 async def get_me(current_user: dict = Depends(get_current_user)):
     return UserResponse(**current_user)
 
-@api_router.get("/movies", response_model=List[Movie])
-async def get_movies():
-    movies = await db.movies.find({}, {"_id": 0}).to_list(1000)
-    return movies
+GZIP_MIN_BYTES = 1024
+
+MOVIE_SORT = [("created_at", 1), ("id", 1)]
+THEATER_SORT = [("created_at", 1), ("id", 1)]
+SHOW_SORT = [("date", 1), ("start_time", 1), ("id", 1)]
+BOOKING_SORT = [("booking_time", -1), ("id", -1)]
+
+# Read endpoints serialise stored documents as-is with orjson; set
+# STRICT_RESPONSE_VALIDATION to validate them against the models again.
+STRICT_RESPONSE_VALIDATION = os.getenv("STRICT_RESPONSE_VALIDATION", "false").lower() in ("1", "true", "yes")
+responses = ResponseEncoder(strict=STRICT_RESPONSE_VALIDATION)
+
+MOVIE_PROJECTION = model_projection(Movie)
+MOVIE_SUMMARY_PROJECTION = model_projection(MovieSummary)
+THEATER_PROJECTION = model_projection(Theater)
+THEATER_SUMMARY_PROJECTION = model_projection(TheaterSummary)
+# Bookings pick up bookkeeping fields (the sweeper's `expired_by`, seat
+# claims) that are not part of the API.
+BOOKING_PROJECTION = model_projection(Booking)
+
+async def catalog_response(request: Request, collection: str, key: str, build) -> Response:
+    # The serialised body (and its ETag) is kept until an admin write bumps the
+    # collection's cache generation, so repeat views skip Mongo and pydantic.
+    body_key = catalog.body_key(collection, key)
+    body = catalog.bodies.get(body_key)
+    if body is None:
+        content, next_cursor = await build()
+        body = PrecomputedBody(content, next_cursor)
+        catalog.bodies.set(body_key, body)
+    
+    headers = {"ETag": body.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if body.next_cursor:
+        headers["X-Next-Cursor"] = body.next_cursor
+    if body.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if len(body.body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body.gzipped, media_type="application/json", headers=headers)
+    return Response(content=body.body, media_type="application/json", headers=headers)
+
+@api_router.get("/movies", response_model=Union[List[Movie], List[MovieSummary]])
+async def get_movies(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$")
+):
+    async def build():
+        summary = view == "summary"
+        movies, next_cursor = await fetch_page(db.movies, {}, MOVIE_SORT, limit, after, MOVIE_SUMMARY_PROJECTION if summary else MOVIE_PROJECTION)
+        return responses.documents(MovieSummary if summary else Movie, movies), next_cursor
+    
+    return await catalog_response(request, "movies", f"{view}:{limit}:{normalize_cursor(after, MOVIE_SORT)}", build)
 
 @api_router.get("/movies/{movie_id}", response_model=Movie)
 async def get_movie(movie_id: str):
-    movie = await db.movies.find_one({"id": movie_id}, {"_id": 0})
+    movie = await catalog.get("movies", movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return movie
+    return responses.response(responses.document(Movie, movie))
 
-@api_router.get("/theaters", response_model=List[Theater])
-async def get_theaters():
-    theaters = await db.theaters.find({}, {"_id": 0}).to_list(1000)
-    return theaters
+@api_router.get("/theaters", response_model=Union[List[Theater], List[TheaterSummary]])
+async def get_theaters(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$")
+):
+    async def build():
+        summary = view == "summary"
+        theaters, next_cursor = await fetch_page(db.theaters, {}, THEATER_SORT, limit, after, THEATER_SUMMARY_PROJECTION if summary else THEATER_PROJECTION)
+        return responses.documents(TheaterSummary if summary else Theater, theaters), next_cursor
+    
+    return await catalog_response(request, "theaters", f"{view}:{limit}:{normalize_cursor(after, THEATER_SORT)}", build)
 
 @api_router.get("/theaters/{theater_id}", response_model=Theater)
 async def get_theater(theater_id: str):
-    theater = await db.theaters.find_one({"id": theater_id}, {"_id": 0})
+    theater = await catalog.get("theaters", theater_id)
     if not theater:
         raise HTTPException(status_code=404, detail="Theater not found")
-    return theater
+    return responses.response(responses.document(Theater, theater))
 
 @api_router.get("/shows")
-async def get_shows(movie_id: Optional[str] = None, date: Optional[str] = None, theater_id: Optional[str] = None):
+async def get_shows(
+    request: Request,
+    movie_id: Optional[str] = None,
+    date: Optional[str] = None,
+    theater_id: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    after: Optional[str] = None
+):
     query = {}
     if movie_id:
         query["movie_id"] = movie_id
@@ -250,65 +457,103 @@ async def get_shows(movie_id: Optional[str] = None, date: Optional[str] = None,
     if theater_id:
         query["theater_id"] = theater_id
     
-    shows = await db.shows.find(query, {"_id": 0}).to_list(1000)
-    return shows
+    async def build():
+        shows, next_cursor = await fetch_page(db.shows, query, SHOW_SORT, limit, after)
+        return responses.documents(Show, shows), next_cursor
+    
+    return await catalog_response(request, "shows", json.dumps([query, limit, normalize_cursor(after, SHOW_SORT)], sort_keys=True), build)
 
-@api_router.get("/shows/{show_id}")
+@api_router.get("/shows/{show_id}", response_model=Show)
 async def get_show(show_id: str):
-    show = await db.shows.find_one({"id": show_id}, {"_id": 0})
+    show = await catalog.get("shows", show_id)
     if not show:
         raise HTTPException(status_code=404, detail="Show not found")
-    return show
+    return responses.response(responses.document(Show, show))
 
 @api_router.get("/shows/{show_id}/seats")
 async def get_seats(show_id: str):
-    show = await db.shows.find_one({"id": show_id}, {"_id": 0})
+    show = await catalog.get("shows", show_id)
     if not show:
         raise HTTPException(status_code=404, detail="Show not found")
     
-    theater = await db.theaters.find_one({"id": show["theater_id"]}, {"_id": 0})
-    screen = next((s for s in theater["screens"] if s["screen_number"] == show["screen_number"]), None)
-    
-    bookings = await db.bookings.find({"show_id": show_id, "status": {"$in": ["confirmed", "pending"]}}, {"_id": 0}).to_list(1000)
-    booked_seats = []
-    for booking in bookings:
-        booked_seats.extend(booking["seats"])
+    inventory = await load_seat_inventory(db, show)
+    if not inventory:
+        raise HTTPException(status_code=404, detail="Screen not found")
     
-    seat_layout = screen["seat_layout"]
-    seats = []
-    for row in seat_layout["rows"]:
-        row_seats = []
-        for i in range(seat_layout["seats_per_row"]):
-            seat_number = f"{row}{i+1}"
-            status = "booked" if seat_number in booked_seats else "available"
-            row_seats.append({"seat_number": seat_number, "status": status})
-        seats.append(row_seats)
+    seats = render_seat_map(inventory)
     
-    return {"show_id": show_id, "seats": seats, "price": show["price"]}
+    return responses.response({"show_id": show_id, "seats": seats, "price": show["price"], "version": inventory.get("version", 0)})
+
+async def seat_snapshot(show_id: str) -> Optional[str]:
+    show = await catalog.get("shows", show_id)
+    inventory = await load_seat_inventory(db, show) if show else None
+    if not inventory:
+        return None
+    return json.dumps({
+        "type": "seat_snapshot",
+        "seats": render_seat_map(inventory),
+        "version": inventory.get("version", 0)
+    })
+
+async def resync_seats(connection, show_id: str, since: int):
+    missed = manager.replay(show_id, since)
+    if missed == [] and since > 0:
+        # Nothing newer in memory; make sure the client isn't ahead of the
+        # inventory itself (history lost on restart, or a stale version).
+        inventory = await db.seat_inventory.find_one({"show_id": show_id}, {"_id": 0, "version": 1})
+        if since > (inventory or {}).get("version", 0):
+            missed = None
+    if missed is not None:
+        for text in missed:
+            manager.enqueue(connection, text)
+        return
+    
+    snapshot = await seat_snapshot(show_id)
+    if snapshot:
+        manager.enqueue(connection, snapshot)
 
 @app.websocket("/ws/seats/{show_id}")
 async def websocket_endpoint(websocket: WebSocket, show_id: str):
-    await manager.connect(websocket, show_id)
+    connection = await manager.connect(websocket, show_id)
     try:
+        since = websocket.query_params.get("since")
+        if since is not None and since.isdigit():
+            await resync_seats(connection, show_id, int(since))
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, show_id)
+            message = await websocket.receive_text()
+            try:
+                request = json.loads(message)
+            except ValueError:
+                continue
+            if isinstance(request, dict) and request.get("type") == "resync" and isinstance(request.get("since"), int):
+                await resync_seats(connection, show_id, request["since"])
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        manager.disconnect(connection)
 
 @api_router.post("/bookings")
 async def create_booking(booking: BookingCreate, current_user: dict = Depends(get_current_user)):
-    show = await db.shows.find_one({"id": booking.show_id}, {"_id": 0})
+    show = await catalog.get("shows", booking.show_id)
     if not show:
         raise HTTPException(status_code=404, detail="Show not found")
     
-    bookings = await db.bookings.find({"show_id": booking.show_id, "status": {"$in": ["confirmed", "pending"]}}, {"_id": 0}).to_list(1000)
-    booked_seats = []
-    for b in bookings:
-        booked_seats.extend(b["seats"])
+    layout = await get_seat_layout(db, show)
+    if not layout:
+        raise HTTPException(status_code=404, detail="Screen not found")
+    
+    if not booking.seats:
+        raise HTTPException(status_code=400, detail="No seats selected")
     
+    if len(set(booking.seats)) != len(booking.seats):
+        raise HTTPException(status_code=400, detail="Duplicate seats in booking")
+    
+    indices = []
     for seat in booking.seats:
-        if seat in booked_seats:
-            raise HTTPException(status_code=400, detail=f"Seat {seat} is already booked")
+        index = seat_index(layout, seat)
+        if index is None:
+            raise HTTPException(status_code=400, detail=f"Seat {seat} does not exist")
+        indices.append(index)
     
     total_amount = len(booking.seats) * show["price"]
     
@@ -317,50 +562,76 @@ async def create_booking(booking: BookingCreate, current_user: dict = Depends(ge
         show_id=booking.show_id,
         seats=booking.seats,
         total_amount=total_amount,
-        status="pending"
+        status="pending",
+        hold_expires_at=(datetime.now(timezone.utc) + timedelta(minutes=SEAT_HOLD_MINUTES)).isoformat()
     )
     
-    await db.bookings.insert_one(new_booking.model_dump())
+    version = await claim_seats(db, booking.show_id, indices, new_booking.id, new_booking.hold_expires_at)
+    if version is None:
+        inventory = await load_seat_inventory(db, show)
+        taken = next((seat for seat, i in zip(booking.seats, indices) if inventory["seats"][i] != SEAT_AVAILABLE), booking.seats[0])
+        raise HTTPException(status_code=400, detail=f"Seat {taken} is already booked")
     
-    await manager.broadcast(booking.show_id, {
-        "type": "seat_update",
-        "seats": booking.seats,
-        "status": "booked"
-    })
+    # If this insert never lands (error, cancelled request, dead worker), the
+    # claim recorded above lets reconcile_seat_claims free the seats.
+    try:
+        await db.bookings.insert_one(new_booking.model_dump())
+    except Exception:
+        version = await settle_claim(db, booking.show_id, new_booking.id, indices)
+        await publish_seat_update(booking.show_id, booking.seats, "available", version)
+        raise
+    
+    await publish_seat_update(booking.show_id, booking.seats, "booked", version)
+    await record_transitions([(new_booking.model_dump(), show, None, "pending")])
     
     return new_booking.model_dump()
 
-@api_router.get("/bookings/my")
-async def get_my_bookings(current_user: dict = Depends(get_current_user)):
-    bookings = await db.bookings.find({"user_id": current_user["id"]}, {"_id": 0}).sort("booking_time", -1).to_list(1000)
+async def attach_booking_details(bookings: List[dict]):
+    show_ids = list({booking["show_id"] for booking in bookings})
+    if not show_ids:
+        return
+    
+    shows_by_id = await catalog.get_many("shows", show_ids)
+    movies_by_id, theaters_by_id = await asyncio.gather(
+        catalog.get_many("movies", [show["movie_id"] for show in shows_by_id.values()]),
+        catalog.get_many("theaters", [show["theater_id"] for show in shows_by_id.values()])
+    )
     
     for booking in bookings:
-        show = await db.shows.find_one({"id": booking["show_id"]}, {"_id": 0})
+        show = shows_by_id.get(booking["show_id"])
         if show:
-            movie = await db.movies.find_one({"id": show["movie_id"]}, {"_id": 0})
-            theater = await db.theaters.find_one({"id": show["theater_id"]}, {"_id": 0})
             booking["show"] = show
-            booking["movie"] = movie
-            booking["theater"] = theater
+            booking["movie"] = movies_by_id.get(show["movie_id"])
+            booking["theater"] = theaters_by_id.get(show["theater_id"])
+
+@api_router.get("/bookings/my")
+async def get_my_bookings(
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    bookings, next_cursor = await fetch_page(
+        db.bookings,
+        {"user_id": current_user["id"]},
+        BOOKING_SORT,
+        limit,
+        after,
+        BOOKING_PROJECTION
+    )
+    await attach_booking_details(bookings)
     
-    return bookings
+    return responses.response(bookings, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
 @api_router.get("/bookings/{booking_id}")
 async def get_booking(booking_id: str, current_user: dict = Depends(get_current_user)):
-    booking = await db.bookings.find_one({"id": booking_id}, {"_id": 0})
+    booking = await db.bookings.find_one({"id": booking_id}, BOOKING_PROJECTION)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
     if booking["user_id"] != current_user["id"] and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    show = await db.shows.find_one({"id": booking["show_id"]}, {"_id": 0})
-    movie = await db.movies.find_one({"id": show["movie_id"]}, {"_id": 0})
-    theater = await db.theaters.find_one({"id": show["theater_id"]}, {"_id": 0})
-    
-    booking["show"] = show
-    booking["movie"] = movie
-    booking["theater"] = theater
+    await attach_booking_details([booking])
     
     return booking
 
@@ -376,16 +647,130 @@ async def cancel_booking(booking_id: str, current_user: dict = Depends(get_curre
     if booking["status"] == "cancelled":
         raise HTTPException(status_code=400, detail="Booking already cancelled")
     
-    await db.bookings.update_one({"id": booking_id}, {"$set": {"status": "cancelled"}})
+    if booking["status"] == "expired":
+        raise HTTPException(status_code=400, detail="Booking hold has expired")
     
-    await manager.broadcast(booking["show_id"], {
-        "type": "seat_update",
-        "seats": booking["seats"],
-        "status": "available"
-    })
+    result = await db.bookings.update_one({"id": booking_id, "status": booking["status"]}, {"$set": {"status": "cancelled"}})
+    if result.modified_count == 0:
+        raise HTTPException(status_code=409, detail="Booking status changed, please retry")
+    
+    show = await catalog.get("shows", booking["show_id"])
+    version = await release_seats(db, show, booking["seats"]) if show else None
+    
+    await publish_seat_update(booking["show_id"], booking["seats"], "available", version)
+    await record_transitions([(booking, show, booking["status"], "cancelled")])
     
     return {"message": "Booking cancelled successfully"}
 
+async def record_transitions(transitions: list):
+    # Rollups are derived data: a failure here is logged and repaired by the
+    # rebuild command rather than failing the booking request.
+    try:
+        await apply_rollup_ops(db, [op for transition in transitions for op in rollup_ops(*transition)])
+    except Exception:
+        logger.exception("Failed to update analytics rollups")
+
+async def confirm_booking(booking_id: str):
+    booking = await db.bookings.find_one_and_update({"id": booking_id, "status": "pending"}, {"$set": {"status": "confirmed"}}, projection={"_id": 0})
+    if booking:
+        show = await catalog.get("shows", booking["show_id"])
+        await record_transitions([(booking, show, "pending", "confirmed")])
+        return
+    
+    booking = await db.bookings.find_one({"id": booking_id}, {"_id": 0})
+    if not booking or booking["status"] != "expired":
+        return
+    
+    # Paid after the hold lapsed: confirm only if nobody has taken the seats since.
+    show = await catalog.get("shows", booking["show_id"])
+    layout = await get_seat_layout(db, show) if show else None
+    indices = [seat_index(layout, seat) for seat in booking["seats"]] if layout else []
+    now = datetime.now(timezone.utc).isoformat()
+    version = await claim_seats(db, booking["show_id"], indices, booking_id, now) if indices and None not in indices else None
+    if version is None:
+        logger.warning(f"Booking {booking_id} was paid after its hold expired and its seats are no longer available")
+        return
+    
+    await db.bookings.update_one({"id": booking_id, "status": "expired"}, {"$set": {"status": "confirmed"}})
+    await publish_seat_update(booking["show_id"], booking["seats"], "booked", version)
+    await record_transitions([(booking, show, "expired", "confirmed")])
+
+def expired_hold_filter(now: datetime) -> dict:
+    # Pending bookings made before holds were recorded have no
+    # hold_expires_at; their hold runs from booking_time instead.
+    return {
+        "status": "pending",
+        "$or": [
+            {"hold_expires_at": {"$lt": now.isoformat()}},
+            {"hold_expires_at": None, "booking_time": {"$lt": (now - timedelta(minutes=SEAT_HOLD_MINUTES)).isoformat()}}
+        ]
+    }
+
+async def release_expired_holds() -> int:
+    expired_filter = expired_hold_filter(datetime.now(timezone.utc))
+    expired = await db.bookings.find(
+        expired_filter,
+        {"_id": 0, "id": 1}
+    ).limit(HOLD_SWEEP_BATCH_SIZE).to_list(HOLD_SWEEP_BATCH_SIZE)
+    if not expired:
+        return 0
+    
+    # Tag the bookings this sweep actually flipped so a concurrent payment or
+    # another worker's sweeper never gets its seats released twice.
+    sweep_id = str(uuid.uuid4())
+    await db.bookings.update_many(
+        {"id": {"$in": [b["id"] for b in expired]}, **expired_filter},
+        {"$set": {"status": "expired", "expired_by": sweep_id}}
+    )
+    released = await db.bookings.find({"expired_by": sweep_id}, {"_id": 0}).to_list(None)
+    
+    seats_by_show: Dict[str, List[str]] = {}
+    for booking in released:
+        seats_by_show.setdefault(booking["show_id"], []).extend(booking["seats"])
+    
+    shows_by_id = await catalog.get_many("shows", seats_by_show)
+    for show in shows_by_id.values():
+        version = await release_seats(db, show, seats_by_show[show["id"]])
+        await publish_seat_update(show["id"], seats_by_show[show["id"]], "available", version)
+    
+    await record_transitions([(booking, shows_by_id.get(booking["show_id"]), "pending", "expired") for booking in released])
+    
+    return len(released)
+
+async def reconcile_seat_claims() -> int:
+    # Once a claim's hold has lapsed its booking's own lifecycle (confirm,
+    # cancel, expiry sweep) owns the seats and the claim record is dropped.
+    # A claim whose booking was never written is orphaned: free its seats.
+    now = datetime.now(timezone.utc).isoformat()
+    claims = await find_expired_claims(db, now, HOLD_SWEEP_BATCH_SIZE)
+    if not claims:
+        return 0
+    
+    bookings = await db.bookings.find({"id": {"$in": [claim["booking_id"] for claim in claims]}}, {"_id": 0, "id": 1}).to_list(None)
+    booked = {booking["id"] for booking in bookings}
+    
+    for claim in claims:
+        if claim["booking_id"] in booked:
+            await settle_claim(db, claim["show_id"], claim["booking_id"])
+            continue
+        version = await settle_claim(db, claim["show_id"], claim["booking_id"], claim["seats"])
+        if version is not None:
+            logger.warning(f"Released seats {claim['seat_numbers']} of show {claim['show_id']} held by missing booking {claim['booking_id']}")
+            await publish_seat_update(claim["show_id"], claim["seat_numbers"], "available", version)
+    
+    return len(claims)
+
+async def sweep_expired_holds():
+    while True:
+        try:
+            while await release_expired_holds() >= HOLD_SWEEP_BATCH_SIZE:
+                pass
+            while await reconcile_seat_claims() >= HOLD_SWEEP_BATCH_SIZE:
+                pass
+        except Exception:
+            logger.exception("Expired hold sweep failed")
+        await asyncio.sleep(HOLD_SWEEP_INTERVAL_SECONDS)
+
 @api_router.post("/payments/checkout")
 async def create_checkout_session(request: Request, booking_id: str, origin_url: str, current_user: dict = Depends(get_current_user)):
     booking = await db.bookings.find_one({"id": booking_id}, {"_id": 0})
@@ -398,10 +783,8 @@ async def create_checkout_session(request: Request, booking_id: str, origin_url:
     if booking["status"] != "pending":
         raise HTTPException(status_code=400, detail="Booking already processed")
     
-    stripe_api_key = os.getenv("STRIPE_API_KEY")
     host_url = str(request.base_url)
     webhook_url = f"{host_url}api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
     
     success_url = f"{origin_url}/booking/success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{origin_url}/booking/{booking['show_id']}"
@@ -414,7 +797,7 @@ async def create_checkout_session(request: Request, booking_id: str, origin_url:
         metadata={"booking_id": booking_id, "user_id": current_user["id"]}
     )
     
-    session = await stripe_checkout.create_checkout_session(checkout_request)
+    session = await payment_client.create_checkout_session(webhook_url, checkout_request)
     
     await db.payment_transactions.insert_one({
         "id": str(uuid.uuid4()),
@@ -433,8 +816,7 @@ async def create_checkout_session(request: Request, booking_id: str, origin_url:
     
     return {"url": session.url, "session_id": session.session_id}
 
-@api_router.get("/payments/status/{session_id}")
-async def get_payment_status(session_id: str, current_user: dict = Depends(get_current_user)):
+async def load_payment_status(session_id: str) -> dict:
     transaction = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
@@ -442,54 +824,136 @@ async def get_payment_status(session_id: str, current_user: dict = Depends(get_c
     if transaction["payment_status"] == "paid":
         return transaction
     
-    stripe_api_key = os.getenv("STRIPE_API_KEY")
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url="")
-    
-    checkout_status = await stripe_checkout.get_checkout_status(session_id)
+    checkout_status = await payment_client.get_checkout_status(session_id)
     
     if checkout_status.payment_status == "paid" and transaction["payment_status"] != "paid":
-        await db.payment_transactions.update_one(
-            {"session_id": session_id},
-            {"$set": {"status": "complete", "payment_status": "paid"}}
-        )
-        
-        await db.bookings.update_one(
-            {"id": transaction["booking_id"]},
-            {"$set": {"status": "confirmed"}}
-        )
+        await apply_paid_sessions([session_id])
         
         transaction["status"] = "complete"
         transaction["payment_status"] = "paid"
     
     return transaction
 
+async def apply_paid_sessions(session_ids: List[str]) -> int:
+    # Ordered steps that are each safe to repeat, so a crash at any point is
+    # repaired by simply running them again: mark the transactions paid,
+    # confirm their bookings, then notify waiters.
+    transactions = await db.payment_transactions.find({"session_id": {"$in": session_ids}}, {"_id": 0}).to_list(None)
+    if not transactions:
+        return 0
+    
+    await db.payment_transactions.update_many(
+        {"session_id": {"$in": [t["session_id"] for t in transactions]}, "payment_status": {"$ne": "paid"}},
+        {"$set": {"status": "complete", "payment_status": "paid"}}
+    )
+    for transaction in transactions:
+        await confirm_booking(transaction["booking_id"])
+        await publish_payment_settled(transaction["session_id"])
+    return len(transactions)
+
+async def publish_payment_settled(session_id: str):
+    payment_status.settle(session_id)
+    await broadcaster.publish("payments", {"session_id": session_id})
+
+@api_router.get("/payments/status/{session_id}")
+async def get_payment_status(
+    session_id: str,
+    wait: float = Query(0, ge=0, le=PAYMENT_STATUS_MAX_WAIT_SECONDS),
+    current_user: dict = Depends(get_current_user)
+):
+    load = lambda: load_payment_status(session_id)
+    if wait:
+        return await payment_status.wait(session_id, wait, load)
+    return await payment_status.check(session_id, load)
+
+webhook_events_ready = asyncio.Event()
+
 @api_router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
     
-    stripe_api_key = os.getenv("STRIPE_API_KEY")
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url="")
+    try:
+        webhook_response = await payment_client.handle_webhook(body, signature)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    # Log the event and acknowledge; the webhook worker applies it. Keying the
+    # log by event id makes provider redeliveries no-ops.
+    event_id = getattr(webhook_response, "event_id", None) or f"{webhook_response.session_id}:{webhook_response.payment_status}"
     try:
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        if webhook_response.payment_status == "paid":
-            transaction = await db.payment_transactions.find_one({"session_id": webhook_response.session_id}, {"_id": 0})
-            if transaction and transaction["payment_status"] != "paid":
-                await db.payment_transactions.update_one(
-                    {"session_id": webhook_response.session_id},
-                    {"$set": {"status": "complete", "payment_status": "paid"}}
-                )
-                
-                await db.bookings.update_one(
-                    {"id": transaction["booking_id"]},
-                    {"$set": {"status": "confirmed"}}
-                )
-        
+        await db.webhook_events.insert_one({
+            "_id": event_id,
+            "event_type": webhook_response.event_type,
+            "session_id": webhook_response.session_id,
+            "payment_status": webhook_response.payment_status,
+            "status": "queued",
+            "attempts": 0,
+            "received_at": datetime.now(timezone.utc).isoformat()
+        })
+    except DuplicateKeyError:
         return {"status": "success"}
+    
+    webhook_events_ready.set()
+    return {"status": "success"}
+
+async def process_webhook_events() -> int:
+    now = datetime.now(timezone.utc)
+    claimable = {"$or": [
+        {"status": "queued"},
+        {"status": "processing", "lease_until": {"$lt": now.isoformat()}}
+    ]}
+    queued = await db.webhook_events.find(claimable, {"_id": 1}).sort("received_at", 1).limit(WEBHOOK_BATCH_SIZE).to_list(WEBHOOK_BATCH_SIZE)
+    if not queued:
+        return 0
+    
+    # Lease the batch so another worker skips it, and a crashed worker's batch
+    # is picked up again once the lease runs out.
+    claim_id = str(uuid.uuid4())
+    await db.webhook_events.update_many(
+        {"_id": {"$in": [e["_id"] for e in queued]}, **claimable},
+        {
+            "$set": {"status": "processing", "claimed_by": claim_id, "lease_until": (now + timedelta(seconds=WEBHOOK_LEASE_SECONDS)).isoformat()},
+            "$inc": {"attempts": 1}
+        }
+    )
+    events = await db.webhook_events.find({"claimed_by": claim_id}).to_list(None)
+    
+    paid_sessions = list({e["session_id"] for e in events if e["payment_status"] == "paid"})
+    try:
+        if paid_sessions:
+            await apply_paid_sessions(paid_sessions)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        logger.exception(f"Applying {len(events)} webhook events failed")
+        exhausted = [event["_id"] for event in events if event["attempts"] >= WEBHOOK_MAX_ATTEMPTS]
+        await db.webhook_events.update_many(
+            {"claimed_by": claim_id, "_id": {"$nin": exhausted}},
+            {"$set": {"status": "queued", "error": str(e)}, "$unset": {"lease_until": ""}}
+        )
+        await db.webhook_events.update_many(
+            {"claimed_by": claim_id, "_id": {"$in": exhausted}},
+            {"$set": {"status": "failed", "error": str(e)}, "$unset": {"lease_until": ""}}
+        )
+        return len(events)
+    
+    await db.webhook_events.update_many(
+        {"claimed_by": claim_id},
+        {"$set": {"status": "processed", "processed_at": datetime.now(timezone.utc).isoformat()}, "$unset": {"lease_until": ""}}
+    )
+    return len(events)
+
+async def drain_webhook_events():
+    while True:
+        try:
+            while await process_webhook_events() >= WEBHOOK_BATCH_SIZE:
+                pass
+        except Exception:
+            logger.exception("Webhook event processing failed")
+        try:
+            await asyncio.wait_for(webhook_events_ready.wait(), WEBHOOK_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        webhook_events_ready.clear()
 
 @api_router.post("/admin/movies", response_model=Movie)
 async def create_movie(movie: MovieCreate, current_user: dict = Depends(get_current_user)):
@@ -498,6 +962,7 @@ async def create_movie(movie: MovieCreate, current_user: dict = Depends(get_curr
     
     new_movie = Movie(**movie.model_dump())
     await db.movies.insert_one(new_movie.model_dump())
+    await invalidate_catalog("movies", new_movie.id)
     return new_movie
 
 @api_router.put("/admin/movies/{movie_id}", response_model=Movie)
@@ -510,7 +975,8 @@ async def update_movie(movie_id: str, movie: MovieCreate, current_user: dict = D
         raise HTTPException(status_code=404, detail="Movie not found")
     
     await db.movies.update_one({"id": movie_id}, {"$set": movie.model_dump()})
-    updated_movie = await db.movies.find_one({"id": movie_id}, {"_id": 0})
+    await invalidate_catalog("movies", movie_id)
+    updated_movie = await catalog.get("movies", movie_id)
     return Movie(**updated_movie)
 
 @api_router.delete("/admin/movies/{movie_id}")
@@ -522,6 +988,8 @@ async def delete_movie(movie_id: str, current_user: dict = Depends(get_current_u
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Movie not found")
     
+    await invalidate_catalog("movies", movie_id)
+    
     return {"message": "Movie deleted successfully"}
 
 @api_router.post("/admin/theaters", response_model=Theater)
@@ -531,6 +999,7 @@ async def create_theater(theater: TheaterCreate, current_user: dict = Depends(ge
     
     new_theater = Theater(**theater.model_dump())
     await db.theaters.insert_one(new_theater.model_dump())
+    await invalidate_catalog("theaters", new_theater.id)
     return new_theater
 
 @api_router.put("/admin/theaters/{theater_id}", response_model=Theater)
@@ -542,8 +1011,21 @@ async def update_theater(theater_id: str, theater: TheaterCreate, current_user:
     if not existing_theater:
         raise HTTPException(status_code=404, detail="Theater not found")
     
+    new_layouts = {screen.get("screen_number"): screen.get("seat_layout") for screen in theater.screens}
+    changed_screens = [
+        screen["screen_number"] for screen in existing_theater["screens"]
+        if new_layouts.get(screen["screen_number"]) != screen.get("seat_layout")
+    ]
+    affected_shows = []
+    if changed_screens:
+        shows = await db.shows.find({"theater_id": theater_id, "screen_number": {"$in": changed_screens}}, {"_id": 0, "id": 1}).to_list(None)
+        affected_shows = [show["id"] for show in shows]
+        await ensure_no_active_bookings(affected_shows, "Cannot change or remove a screen layout while shows on it have active bookings")
+    
     await db.theaters.update_one({"id": theater_id}, {"$set": theater.model_dump()})
-    updated_theater = await db.theaters.find_one({"id": theater_id}, {"_id": 0})
+    await reset_seat_layouts(affected_shows)
+    await invalidate_catalog("theaters", theater_id)
+    updated_theater = await catalog.get("theaters", theater_id)
     return Theater(**updated_theater)
 
 @api_router.delete("/admin/theaters/{theater_id}")
@@ -555,15 +1037,113 @@ async def delete_theater(theater_id: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Theater not found")
     
+    await invalidate_catalog("theaters", theater_id)
+    
     return {"message": "Theater deleted successfully"}
 
+async def ensure_no_active_bookings(show_ids: List[str], detail: str):
+    if show_ids and await db.bookings.find_one({"show_id": {"$in": show_ids}, "status": {"$in": ACTIVE_BOOKING_STATUSES}}, {"_id": 1}):
+        raise HTTPException(status_code=409, detail=detail)
+
+MAX_BULK_SHOWS = int(os.getenv("MAX_BULK_SHOWS", "5000"))
+SCHEDULE_FIELDS = ["id", "movie_id", "theater_id", "screen_number", "date", "start_time", "end_time"]
+
+def parses_as_scheduled(show: dict) -> bool:
+    try:
+        show_interval(show)
+        return True
+    except (ValueError, KeyError, TypeError):
+        return False
+
+async def find_schedule_conflicts(shows: List[dict]) -> List[dict]:
+    try:
+        for show in shows:
+            show_interval(show)
+        start, end = schedule_window(shows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    existing = await db.shows.find(
+        {
+            "theater_id": {"$in": list({show["theater_id"] for show in shows})},
+            "date": {"$gte": start, "$lte": end},
+            "id": {"$nin": [show["id"] for show in shows]}
+        },
+        {"_id": 0, **{field: 1 for field in SCHEDULE_FIELDS}}
+    ).to_list(None)
+    # A stored show with unreadable times must not block every later write
+    # to its theater; it is left out of the check until someone fixes it.
+    valid, malformed = [], []
+    for show in existing:
+        (valid if parses_as_scheduled(show) else malformed).append(show)
+    if malformed:
+        logger.warning(f"Skipping stored shows with invalid times in conflict check: {[show.get('id') for show in malformed]}")
+    overlaps = find_overlaps(valid + shows)
+    
+    # Only report clashes involving the shows being scheduled; pre-existing
+    # overlaps between stored shows are not this request's problem.
+    new_ids = {show["id"] for show in shows}
+    return [
+        {"show": {k: b[k] for k in SCHEDULE_FIELDS}, "conflicts_with": {k: a[k] for k in SCHEDULE_FIELDS}}
+        for a, b in overlaps
+        if a["id"] in new_ids or b["id"] in new_ids
+    ]
+
+SCHEDULE_LOCK_SECONDS = 30
+SCHEDULE_LOCK_WAIT_SECONDS = 5
+
+async def acquire_schedule_lock(key: str, owner: str) -> bool:
+    deadline = time.monotonic() + SCHEDULE_LOCK_WAIT_SECONDS
+    while True:
+        now = datetime.now(timezone.utc)
+        lease = {"owner": owner, "expires_at": (now + timedelta(seconds=SCHEDULE_LOCK_SECONDS)).isoformat()}
+        try:
+            await db.schedule_locks.insert_one({"_id": key, **lease})
+            return True
+        except DuplicateKeyError:
+            # Take over a lease left behind by a request that died mid-write.
+            result = await db.schedule_locks.update_one({"_id": key, "expires_at": {"$lt": now.isoformat()}}, {"$set": lease})
+            if result.modified_count:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(0.05)
+
+@asynccontextmanager
+async def schedule_lock(screens):
+    # Checking for conflicts and writing the shows is not atomic, so changes
+    # to the same screen are serialised across workers with a lease document
+    # per (theater_id, screen_number). Keys are taken in sorted order so two
+    # bulk requests never wait on each other.
+    owner = str(uuid.uuid4())
+    acquired = []
+    try:
+        for theater_id, screen_number in sorted(set(screens)):
+            key = f"{theater_id}:{screen_number}"
+            if not await acquire_schedule_lock(key, owner):
+                raise HTTPException(status_code=409, detail="Another schedule change for this screen is in progress, please retry")
+            acquired.append(key)
+        yield
+    finally:
+        if acquired:
+            await db.schedule_locks.delete_many({"_id": {"$in": acquired}, "owner": owner})
+
+def schedule_conflict(conflicts: List[dict]) -> HTTPException:
+    return HTTPException(status_code=409, detail={"message": "Show times overlap on the same screen", "conflicts": conflicts[:50]})
+
 @api_router.post("/admin/shows", response_model=Show)
 async def create_show(show: ShowCreate, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
     new_show = Show(**show.model_dump())
-    await db.shows.insert_one(new_show.model_dump())
+    async with schedule_lock([(show.theater_id, show.screen_number)]):
+        conflicts = await find_schedule_conflicts([new_show.model_dump()])
+        if conflicts:
+            raise schedule_conflict(conflicts)
+        
+        await db.shows.insert_one(new_show.model_dump())
+    await invalidate_catalog("shows", new_show.id)
     return new_show
 
 @api_router.put("/admin/shows/{show_id}", response_model=Show)
@@ -575,10 +1155,62 @@ async def update_show(show_id: str, show: ShowCreate, current_user: dict = Depen
     if not existing_show:
         raise HTTPException(status_code=404, detail="Show not found")
     
-    await db.shows.update_one({"id": show_id}, {"$set": show.model_dump()})
-    updated_show = await db.shows.find_one({"id": show_id}, {"_id": 0})
+    moved = (existing_show["theater_id"], existing_show["screen_number"]) != (show.theater_id, show.screen_number)
+    if moved:
+        await ensure_no_active_bookings([show_id], "Cannot move a show with active bookings to another screen")
+    
+    async with schedule_lock([(show.theater_id, show.screen_number)]):
+        conflicts = await find_schedule_conflicts([{**show.model_dump(), "id": show_id}])
+        if conflicts:
+            raise schedule_conflict(conflicts)
+        
+        await db.shows.update_one({"id": show_id}, {"$set": show.model_dump()})
+    if moved:
+        await reset_seat_layouts([show_id])
+    await invalidate_catalog("shows", show_id)
+    updated_show = await catalog.get("shows", show_id)
     return Show(**updated_show)
 
+@api_router.post("/admin/shows/bulk")
+async def schedule_shows(schedule: ShowSchedule, dry_run: bool = False, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    try:
+        total = len(schedule.shows) + sum(
+            count_recurrence(rule.start_date, rule.end_date, rule.start_times, rule.weekdays) for rule in schedule.recurrences
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not total:
+        raise HTTPException(status_code=400, detail="Schedule is empty")
+    if total > MAX_BULK_SHOWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_SHOWS} shows per request")
+    
+    drafts = [show.model_dump() for show in schedule.shows]
+    movies = await catalog.get_many("movies", [r.movie_id for r in schedule.recurrences if r.duration_minutes is None])
+    for rule in schedule.recurrences:
+        duration = rule.duration_minutes or movies.get(rule.movie_id, {}).get("duration")
+        if not duration:
+            raise HTTPException(status_code=400, detail=f"Movie {rule.movie_id} not found; pass duration_minutes")
+        try:
+            drafts += expand_recurrence(**rule.model_dump(exclude={"duration_minutes"}), duration_minutes=duration)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    new_shows = [Show(**draft).model_dump() for draft in drafts]
+    async with schedule_lock([(show["theater_id"], show["screen_number"]) for show in new_shows]):
+        conflicts = await find_schedule_conflicts(new_shows)
+        if conflicts:
+            raise schedule_conflict(conflicts)
+        
+        if not dry_run:
+            await db.shows.insert_many([dict(show) for show in new_shows])
+    if not dry_run:
+        await invalidate_catalog("shows")
+    
+    return {"created": 0 if dry_run else len(new_shows), "dry_run": dry_run, "shows": new_shows}
+
 @api_router.delete("/admin/shows/{show_id}")
 async def delete_show(show_id: str, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
@@ -588,41 +1220,278 @@ async def delete_show(show_id: str, current_user: dict = Depends(get_current_use
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Show not found")
     
+    await reset_seat_layouts([show_id])
+    await invalidate_catalog("shows", show_id)
+    
     return {"message": "Show deleted successfully"}
 
+@api_router.put("/admin/users/{user_id}/role", response_model=UserResponse)
+async def update_user_role(user_id: str, update: UserRoleUpdate, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if user_id == current_user["id"] and update.role != "admin":
+        raise HTTPException(status_code=400, detail="Admins cannot remove their own admin role")
+    
+    user = await db.users.find_one_and_update(
+        {"id": user_id},
+        {"$set": {"role": update.role}},
+        projection={"_id": 0, "password_hash": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    await invalidate_principal(user_id)
+    return UserResponse(**user)
+
 @api_router.get("/admin/bookings")
-async def get_all_bookings(current_user: dict = Depends(get_current_user)):
+async def get_all_bookings(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    bookings = await db.bookings.find({}, {"_id": 0}).sort("booking_time", -1).to_list(1000)
-    return bookings
+    bookings, next_cursor = await fetch_page(db.bookings, {"status": status} if status else {}, BOOKING_SORT, limit, after, BOOKING_PROJECTION)
+    return responses.response(responses.documents(Booking, bookings), headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
-@api_router.get("/admin/analytics")
-async def get_analytics(current_user: dict = Depends(get_current_user)):
+EXPORT_FIELDS = ["id", "user_id", "show_id", "seats", "total_amount", "status", "booking_time", "hold_expires_at", "payment_session_id"]
+EXPORT_BATCH_SIZE = 1000
+
+async def export_bookings(query: dict, format: str):
+    cursor = db.bookings.find(query, {"_id": 0}).sort(BOOKING_SORT).batch_size(EXPORT_BATCH_SIZE)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(EXPORT_FIELDS)
+    
+    rows = 0
+    async for booking in cursor:
+        if format == "csv":
+            writer.writerow([" ".join(booking.get(field) or []) if field == "seats" else booking.get(field) for field in EXPORT_FIELDS])
+        else:
+            buffer.write(json.dumps({field: booking.get(field) for field in EXPORT_FIELDS}))
+            buffer.write("\n")
+        rows += 1
+        # Flush one chunk per cursor batch so memory stays flat however many rows match.
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@api_router.get("/admin/bookings/export")
+async def export_all_bookings(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    total_bookings = await db.bookings.count_documents({})
-    confirmed_bookings = await db.bookings.count_documents({"status": "confirmed"})
-    total_revenue = 0
-    bookings = await db.bookings.find({"status": "confirmed"}, {"_id": 0}).to_list(10000)
-    for booking in bookings:
-        total_revenue += booking["total_amount"]
+    query = booking_time_match(start, end)
+    if status:
+        query["status"] = status
     
-    total_movies = await db.movies.count_documents({})
-    total_theaters = await db.theaters.count_documents({})
-    total_shows = await db.shows.count_documents({})
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"bookings-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.{format}"
+    return StreamingResponse(
+        export_bookings(query, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+rollup_state = {"built": False}
+
+async def build_missing_rollups():
+    try:
+        if await ensure_rollups(db):
+            logger.info("Built analytics rollups from existing bookings")
+    except Exception:
+        logger.exception("Building analytics rollups failed; serving live analytics until rebuilt")
+
+@api_router.get("/admin/analytics")
+async def get_analytics(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    source: str = Query("rollup", pattern="^(rollup|live)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    # Rollups only cover all-time totals; a time range needs the live
+    # aggregation, and so does a database whose rollups are not built yet.
+    if not rollup_state["built"]:
+        rollup_state["built"] = await rollups_built(db)
+    live = source == "live" or start or end or not rollup_state["built"]
+    # Catalogue totals come from collection metadata rather than a count scan.
+    analytics, total_movies, total_theaters, total_shows = await asyncio.gather(
+        compute_analytics(db, start, end) if live else read_rollups(db),
+        db.movies.estimated_document_count(),
+        db.theaters.estimated_document_count(),
+        db.shows.estimated_document_count()
+    )
     
     return {
-        "total_bookings": total_bookings,
-        "confirmed_bookings": confirmed_bookings,
-        "total_revenue": total_revenue,
+        **analytics,
         "total_movies": total_movies,
         "total_theaters": total_theaters,
         "total_shows": total_shows
     }
 
+@api_router.post("/admin/analytics/rebuild")
+async def rebuild_analytics(dry_run: bool = False, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return await rebuild_rollups(db, dry_run=dry_run)
+
+@api_router.get("/admin/query-plans")
+async def get_query_plans(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return await explain_query_shapes(db)
+
+@api_router.get("/admin/cache")
+async def get_cache_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    principal_stats = principals.stats()
+    return {
+        "catalog": catalog.stats(),
+        "principals": {
+            **principal_stats,
+            "mode": AUTH_MODE,
+            "claims_only": auth_stats["claims_only"],
+            "db_lookups": auth_stats["db_lookups"],
+            "db_lookups_saved": principal_stats["hits"] + auth_stats["claims_only"]
+        }
+    }
+
+@api_router.get("/admin/connections")
+async def get_connections(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    counts = manager.connection_counts()
+    return {
+        "total_connections": sum(counts.values()),
+        "queued_messages": manager.queued_messages(),
+        "evicted": manager.evicted,
+        "shows": counts
+    }
+
+@api_router.get("/admin/password-hashing")
+async def get_password_hashing_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return password_hasher.stats()
+
+@api_router.get("/admin/payments")
+async def get_payment_client_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    webhook_events = await db.webhook_events.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(None)
+    return {
+        **payment_client.stats(),
+        "status_checks": payment_status.stats(),
+        "webhook_events": {row["_id"]: row["count"] for row in webhook_events}
+    }
+
+metrics_registry.gauge("cinebook_websocket_connections", "Open seat-map WebSocket connections", lambda: sum(manager.connection_counts().values()))
+metrics_registry.gauge("cinebook_websocket_shows", "Shows with at least one WebSocket subscriber", lambda: len(manager.active_connections))
+metrics_registry.gauge("cinebook_websocket_queued_messages", "Broadcast messages waiting in per-connection send queues", manager.queued_messages)
+metrics_registry.gauge("cinebook_websocket_evicted_total", "WebSocket clients evicted for falling behind", lambda: manager.evicted)
+metrics_registry.gauge("cinebook_password_hash_pending", "Password hash jobs queued or running", lambda: password_hasher.pending)
+metrics_registry.gauge("cinebook_password_hash_rejected_total", "Password hash jobs refused by admission control", lambda: password_hasher.rejected)
+metrics_registry.gauge("cinebook_catalog_cache_entries", "Entries in the catalog cache", lambda: catalog.stats()["size"])
+metrics_registry.gauge("cinebook_catalog_cache_hits_total", "Catalog cache hits", lambda: catalog.entries.hits)
+metrics_registry.gauge("cinebook_catalog_cache_misses_total", "Catalog cache misses", lambda: catalog.entries.misses)
+metrics_registry.gauge("cinebook_principal_cache_hits_total", "Authenticated principal cache hits", lambda: principals.hits)
+metrics_registry.gauge("cinebook_auth_db_lookups_total", "User lookups that reached MongoDB during authentication", lambda: auth_stats["db_lookups"])
+metrics_registry.gauge("cinebook_payment_breaker_open", "1 while the payment provider circuit breaker is open", lambda: int(payment_client.breaker.state == "open"))
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Off unless PROFILING_ENABLED is set; admins can then sample a live worker or
+# send `X-Profile: 1` with a request to run it under cProfile.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "ncalls", "pcalls", "filename", "name")
+
+async def is_admin_token(token: str) -> bool:
+    try:
+        user = await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+    except HTTPException:
+        return False
+    return user["role"] == "admin"
+
+sampling_profiler = SamplingProfiler(max_seconds=float(os.getenv("PROFILING_MAX_SECONDS", "60")))
+request_profiler = RequestProfiler(is_admin_token, keep=int(os.getenv("PROFILING_KEEP", "50")))
+
+def require_profiling(current_user: dict):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+@api_router.get("/admin/profiling")
+async def get_profiling_stats(current_user: dict = Depends(get_current_user)):
+    require_profiling(current_user)
+    
+    return {
+        "sampling": {"running": sampling_profiler.running, "windows": sampling_profiler.windows},
+        "requests": request_profiler.stats()
+    }
+
+@api_router.get("/admin/profiling/sample")
+async def sample_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, gt=0),
+    current_user: dict = Depends(get_current_user)
+):
+    require_profiling(current_user)
+    
+    result = await sampling_profiler.profile(seconds, interval_ms / 1000)
+    return PlainTextResponse(
+        SamplingProfiler.collapsed(result["stacks"]),
+        headers={"X-Profile-Samples": str(result["samples"])}
+    )
+
+@api_router.get("/admin/profiling/requests/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    sort: str = Query("cumulative"),
+    limit: int = Query(60, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    require_profiling(current_user)
+    if sort not in PROFILE_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(PROFILE_SORT_KEYS)}")
+    
+    report = request_profiler.get(profile_id, sort, limit)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Not authorized")
+    
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router)
 
 app.add_middleware(
@@ -631,14 +1500,38 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-Profile-Id"],
 )
 
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+app.add_middleware(MetricsMiddleware, metrics=HttpMetrics(metrics_registry))
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def bootstrap_indexes():
+    await ensure_indexes(db)
+    if os.getenv("INDEX_DIAGNOSTICS", "").lower() in ("1", "true", "yes"):
+        await check_query_plans(db)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await broadcaster.start()
+    app.state.hold_sweeper = asyncio.create_task(sweep_expired_holds())
+    app.state.webhook_worker = asyncio.create_task(drain_webhook_events())
+    app.state.rollup_builder = asyncio.create_task(build_missing_rollups())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.hold_sweeper.cancel()
+    app.state.webhook_worker.cancel()
+    app.state.rollup_builder.cancel()
+    await broadcaster.stop()
+    password_hasher.shutdown()
     client.close()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import random
+import uuid
+from collections import Counter
+
+import httpx
+
+# Fires many concurrent bookings for overlapping seats of one show against a
+# running server (ideally several uvicorn workers) and checks that no seat
+# ended up in more than one successful booking.
+
+async def register_user(client: httpx.AsyncClient) -> dict:
+    response = await client.post("/api/auth/register", json={
+        "email": f"stress-{uuid.uuid4().hex[:12]}@test.com",
+        "password": "stress-password",
+        "name": "Stress User"
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def run_stress(base_url: str, show_id: str, users: int, attempts: int, seats_per_booking: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        seat_map = (await client.get(f"/api/shows/{show_id}/seats")).json()["seats"]
+        free_seats = [s["seat_number"] for row in seat_map for s in row if s["status"] == "available"]
+        if len(free_seats) < seats_per_booking:
+            raise SystemExit("Not enough free seats on this show")
+
+        print(f"Registering {users} users...")
+        headers = await asyncio.gather(*[register_user(client) for _ in range(users)])
+
+        async def attempt(i: int):
+            seats = random.sample(free_seats, seats_per_booking)
+            response = await client.post(
+                "/api/bookings",
+                json={"show_id": show_id, "seats": seats},
+                headers=headers[i % users]
+            )
+            return response.status_code, seats
+
+        print(f"Firing {attempts} concurrent bookings over {len(free_seats)} free seats...")
+        results = await asyncio.gather(*[attempt(i) for i in range(attempts)])
+
+        won = Counter(seat for status, seats in results if status == 200 for seat in seats)
+        double_booked = [seat for seat, count in won.items() if count > 1]
+
+        seat_map = (await client.get(f"/api/shows/{show_id}/seats")).json()["seats"]
+        booked_now = {s["seat_number"] for row in seat_map for s in row if s["status"] == "booked"}
+        missing = [seat for seat in won if seat not in booked_now]
+
+        statuses = Counter(status for status, _ in results)
+        print(f"Responses: {dict(statuses)}")
+        print(f"Seats won: {len(won)}")
+        if double_booked or missing:
+            print(f"FAILED: double-booked={double_booked} not-marked-booked={missing}")
+            raise SystemExit(1)
+        print("OK: no double bookings")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent double-booking stress test")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--show-id", required=True)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--attempts", type=int, default=500)
+    parser.add_argument("--seats-per-booking", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(run_stress(args.base_url, args.show_id, args.users, args.attempts, args.seats_per_booking))
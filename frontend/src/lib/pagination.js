@@ -0,0 +1,14 @@
+import axios from 'axios';
+
+// Catalog endpoints are cursor-paginated; follow X-Next-Cursor until the
+// server reports no further pages.
+export const fetchAllPages = async (url, params = {}) => {
+  const items = [];
+  let after = null;
+  do {
+    const response = await axios.get(url, { params: { limit: 1000, ...params, ...(after ? { after } : {}) } });
+    items.push(...response.data);
+    after = response.headers['x-next-cursor'] || null;
+  } while (after);
+  return items;
+};
@@ -23,6 +23,8 @@ export const BookingSuccess = () => {
       return;
     }
 
+    // Each request long-polls: the server holds it until the payment settles
+    // or `wait` seconds pass, so there is no need to re-poll on a timer.
     const pollPaymentStatus = async (attempts = 0) => {
       const maxAttempts = 5;
       
@@ -35,7 +37,7 @@ export const BookingSuccess = () => {
       try {
         const response = await axios.get(
           `${API}/payments/status/${sessionId}`,
-          { headers: getAuthHeaders() }
+          { headers: getAuthHeaders(), params: { wait: 20 } }
         );
 
         if (response.data.payment_status === 'paid') {
@@ -50,7 +52,7 @@ export const BookingSuccess = () => {
           toast.error('Payment session expired');
           setLoading(false);
         } else {
-          setTimeout(() => pollPaymentStatus(attempts + 1), 2000);
+          pollPaymentStatus(attempts + 1);
         }
       } catch (error) {
         console.error('Error checking payment status:', error);
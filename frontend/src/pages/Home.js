@@ -14,9 +14,9 @@ export const Home = () => {
   const navigate = useNavigate();
 
   useEffect(() => {
-    axios.get(`${API}/movies`)
+    axios.get(`${API}/movies`, { params: { view: 'summary', limit: 6 } })
       .then(response => {
-        setMovies(response.data.slice(0, 6));
+        setMovies(response.data);
         setLoading(false);
       })
       .catch(error => {
@@ -4,6 +4,7 @@ import axios from 'axios';
 import { Button } from '../components/ui/button';
 import { Clock, Calendar, MapPin, Star } from 'lucide-react';
 import { toast } from 'sonner';
+import { fetchAllPages } from '../lib/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -20,14 +21,14 @@ export const MovieDetails = () => {
   useEffect(() => {
     Promise.all([
       axios.get(`${API}/movies/${id}`),
-      axios.get(`${API}/shows?movie_id=${id}`),
-      axios.get(`${API}/theaters`)
+      fetchAllPages(`${API}/shows`, { movie_id: id }),
+      fetchAllPages(`${API}/theaters`, { view: 'summary' })
     ])
-      .then(([movieRes, showsRes, theatersRes]) => {
+      .then(([movieRes, shows, theaters]) => {
         setMovie(movieRes.data);
-        setShows(showsRes.data);
+        setShows(shows);
         const theatersMap = {};
-        theatersRes.data.forEach(theater => {
+        theaters.forEach(theater => {
           theatersMap[theater.id] = theater;
         });
         setTheaters(theatersMap);
@@ -1,8 +1,8 @@
 import React, { useEffect, useState } from 'react';
-import axios from 'axios';
 import { MovieCard } from '../components/MovieCard';
 import { Input } from '../components/ui/input';
 import { Search } from 'lucide-react';
+import { fetchAllPages } from '../lib/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -14,10 +14,10 @@ export const Movies = () => {
   const [searchQuery, setSearchQuery] = useState('');
 
   useEffect(() => {
-    axios.get(`${API}/movies`)
-      .then(response => {
-        setMovies(response.data);
-        setFilteredMovies(response.data);
+    fetchAllPages(`${API}/movies`, { view: 'summary' })
+      .then(movies => {
+        setMovies(movies);
+        setFilteredMovies(movies);
         setLoading(false);
       })
       .catch(error => {
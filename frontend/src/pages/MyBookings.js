@@ -14,6 +14,7 @@ export const MyBookings = () => {
   const navigate = useNavigate();
   const [bookings, setBookings] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     if (!user) {
@@ -24,10 +25,11 @@ export const MyBookings = () => {
     fetchBookings();
   }, [user, navigate]);
 
-  const fetchBookings = () => {
-    axios.get(`${API}/bookings/my`, { headers: getAuthHeaders() })
+  const fetchBookings = (after = null) => {
+    axios.get(`${API}/bookings/my`, { headers: getAuthHeaders(), params: after ? { after } : {} })
       .then(response => {
-        setBookings(response.data);
+        setBookings(prev => after ? [...prev, ...response.data] : response.data);
+        setNextCursor(response.headers['x-next-cursor'] || null);
         setLoading(false);
       })
       .catch(error => {
@@ -144,6 +146,13 @@ export const MyBookings = () => {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <div className="text-center">
+                <Button onClick={() => fetchBookings(nextCursor)} variant="outline" data-testid="load-more-bookings-btn">
+                  Load More
+                </Button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { Button } from '../components/ui/button';
@@ -20,7 +20,9 @@ export const SeatSelection = () => {
   const [selectedSeats, setSelectedSeats] = useState([]);
   const [loading, setLoading] = useState(true);
   const [booking, setBooking] = useState(false);
-  const [ws, setWs] = useState(null);
+  const seatVersion = useRef(0);
+  const socket = useRef(null);
+  const reconnectTimer = useRef(null);
 
   useEffect(() => {
     if (!user) {
@@ -29,6 +31,70 @@ export const SeatSelection = () => {
       return;
     }
 
+    let active = true;
+    let attempts = 0;
+
+    const connect = () => {
+      const wsUrl = BACKEND_URL.replace('https://', 'wss://').replace('http://', 'ws://');
+      // `since` lets the server replay just the deltas missed while
+      // disconnected, or send a snapshot when it cannot.
+      const websocket = new WebSocket(`${wsUrl}/ws/seats/${showId}?since=${seatVersion.current}`);
+      socket.current = websocket;
+
+      websocket.onopen = () => {
+        if (attempts >= 3) {
+          toast.success('Live seat updates restored');
+        }
+        attempts = 0;
+      };
+
+      websocket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'seat_snapshot') {
+          // The server's word on the whole map, even if it is behind the
+          // version we hold (lost history, or a rebuilt inventory).
+          seatVersion.current = data.version;
+          setSeats(data.seats);
+        } else if (data.type === 'seat_update') {
+          if (data.version != null) {
+            if (data.version <= seatVersion.current) {
+              return;
+            }
+            if (data.version > seatVersion.current + 1) {
+              websocket.send(JSON.stringify({ type: 'resync', since: seatVersion.current }));
+              return;
+            }
+            seatVersion.current = data.version;
+          }
+          setSeats(prevSeats => {
+            const newSeats = [...prevSeats];
+            data.seats.forEach(seatNumber => {
+              for (let i = 0; i < newSeats.length; i++) {
+                const seatIndex = newSeats[i].findIndex(s => s.seat_number === seatNumber);
+                if (seatIndex !== -1) {
+                  newSeats[i][seatIndex].status = data.status;
+                }
+              }
+            });
+            return newSeats;
+          });
+        }
+      };
+
+      websocket.onclose = () => {
+        if (!active) {
+          return;
+        }
+        // Dropped, or closed by the server for falling behind (1013): keep
+        // the map and version we have and resume from there.
+        attempts += 1;
+        if (attempts === 3) {
+          toast.error('Live seat updates interrupted, reconnecting...');
+        }
+        reconnectTimer.current = setTimeout(connect, Math.min(1000 * 2 ** (attempts - 1), 30000));
+      };
+    };
+
     Promise.all([
       axios.get(`${API}/shows/${showId}`),
       axios.get(`${API}/shows/${showId}/seats`)
@@ -37,6 +103,7 @@ export const SeatSelection = () => {
         setShow(showRes.data);
         setSeats(seatsRes.data.seats);
         setPrice(seatsRes.data.price);
+        seatVersion.current = seatsRes.data.version || 0;
         
         const [movieRes, theaterRes] = await Promise.all([
           axios.get(`${API}/movies/${showRes.data.movie_id}`),
@@ -47,28 +114,9 @@ export const SeatSelection = () => {
         setTheater(theaterRes.data);
         setLoading(false);
         
-        const wsUrl = BACKEND_URL.replace('https://', 'wss://').replace('http://', 'ws://');
-        const websocket = new WebSocket(`${wsUrl}/ws/seats/${showId}`);
-        
-        websocket.onmessage = (event) => {
-          const data = JSON.parse(event.data);
-          if (data.type === 'seat_update') {
-            setSeats(prevSeats => {
-              const newSeats = [...prevSeats];
-              data.seats.forEach(seatNumber => {
-                for (let i = 0; i < newSeats.length; i++) {
-                  const seatIndex = newSeats[i].findIndex(s => s.seat_number === seatNumber);
-                  if (seatIndex !== -1) {
-                    newSeats[i][seatIndex].status = data.status;
-                  }
-                }
-              });
-              return newSeats;
-            });
-          }
-        };
-        
-        setWs(websocket);
+        if (active) {
+          connect();
+        }
       })
       .catch(error => {
         console.error('Error fetching show details:', error);
@@ -77,8 +125,10 @@ export const SeatSelection = () => {
       });
 
     return () => {
-      if (ws) {
-        ws.close();
+      active = false;
+      clearTimeout(reconnectTimer.current);
+      if (socket.current) {
+        socket.current.close();
       }
     };
   }, [showId, user, navigate]);
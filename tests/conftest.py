@@ -0,0 +1,27 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "cinebook_test")
+
+from mongo_memory import memory_database
+
+@pytest.fixture
+def db():
+    return memory_database("cinebook_test")
+
+@pytest.fixture
+def server(db, monkeypatch):
+    import seat_inventory
+    import server
+
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server.catalog, "db", db)
+    server.catalog.entries.clear()
+    server.catalog.bodies.clear()
+    seat_inventory._seat_layouts.clear()
+    return server
@@ -0,0 +1,70 @@
+import asyncio
+
+from analytics import apply_rollup_ops, ensure_rollups, read_rollups, rollup_ops, rollups_built
+
+SHOW = {"id": "s1", "movie_id": "m1", "theater_id": "t1", "screen_number": 1, "start_time": "18:00", "end_time": "20:00", "price": 10.0, "date": "2025-06-01"}
+
+def booking(booking_id: str, status: str, seats: list) -> dict:
+    return {"id": booking_id, "user_id": "u1", "show_id": "s1", "seats": seats, "total_amount": 10.0 * len(seats), "status": status, "booking_time": "2025-05-20T10:00:00+00:00"}
+
+async def seed_existing(db):
+    # Bookings written before rollups existed: nothing in analytics_rollups.
+    await db.movies.insert_one({"id": "m1", "title": "Movie"})
+    await db.theaters.insert_one({"id": "t1", "name": "Theater"})
+    await db.shows.insert_one(dict(SHOW))
+    await db.bookings.insert_many([booking("b1", "confirmed", ["A1", "A2"]), booking("b2", "cancelled", ["A3"])])
+
+def test_existing_bookings_are_rolled_up_before_increments(db):
+    async def run():
+        await seed_existing(db)
+        assert not await rollups_built(db)
+        assert await ensure_rollups(db)
+        assert not await ensure_rollups(db)
+
+        confirmed = await db.bookings.find_one({"id": "b1"}, {"_id": 0})
+        await apply_rollup_ops(db, rollup_ops(confirmed, SHOW, "confirmed", "cancelled"))
+        return await read_rollups(db)
+
+    report = asyncio.run(run())
+
+    assert report["total_bookings"] == 2
+    assert report["confirmed_bookings"] == 0
+    assert report["total_revenue"] == 0
+    assert report["seats_sold"] == 0
+    assert report["by_status"] == {"cancelled": 2}
+    assert report["by_movie"] == []
+
+def test_read_rollups_reports_built_totals(db):
+    async def run():
+        await seed_existing(db)
+        await ensure_rollups(db)
+        return await read_rollups(db)
+
+    report = asyncio.run(run())
+
+    assert report["confirmed_bookings"] == 1
+    assert report["total_revenue"] == 20.0
+    assert report["by_movie"] == [{"movie_id": "m1", "bookings": 1, "seats": 2, "revenue": 20.0, "name": "Movie"}]
+    assert report["by_theater"][0]["name"] == "Theater"
+    assert report["by_show_date"][0]["date"] == "2025-06-01"
+
+def test_concurrent_builder_backs_off(db):
+    async def run():
+        await seed_existing(db)
+        await db.analytics_rollups.insert_one({"_id": "meta:building", "scope": "meta", "key": "building", "started_at": "9999-01-01T00:00:00+00:00"})
+        built = await ensure_rollups(db)
+        return built, await rollups_built(db)
+
+    assert asyncio.run(run()) == (False, False)
+
+def test_rollup_report_includes_catalogue_totals(server, db):
+    async def run():
+        await seed_existing(db)
+        await ensure_rollups(db)
+        server.rollup_state["built"] = False
+        return await server.get_analytics(start=None, end=None, source="rollup", current_user={"id": "admin", "role": "admin"})
+
+    report = asyncio.run(run())
+
+    assert (report["total_movies"], report["total_theaters"], report["total_shows"]) == (1, 1, 1)
+    assert report["total_bookings"] == 2
@@ -0,0 +1,83 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+
+THEATER = {"id": "t1", "name": "Theater", "location": "Here", "screens": [{"screen_number": 1, "total_seats": 20, "seat_layout": {"rows": ["A", "B"], "seats_per_row": 10}}]}
+SHOW = {"id": "s1", "movie_id": "m1", "theater_id": "t1", "screen_number": 1, "start_time": "18:00", "end_time": "20:00", "price": 10.0, "date": "2025-06-01", "created_at": "2025-01-01T00:00:00+00:00"}
+SEATS = [f"{row}{n}" for row in "AB" for n in range(1, 11)]
+
+def interleave_claims(server, monkeypatch):
+    # mongomock answers without yielding; make every request reach its claim
+    # before any of them runs it, as concurrent requests on real Mongo would.
+    claim_seats = server.claim_seats
+
+    async def claim_after_yield(*args):
+        await asyncio.sleep(0.01)
+        return await claim_seats(*args)
+
+    monkeypatch.setattr(server, "claim_seats", claim_after_yield)
+
+async def seed(db):
+    await db.theaters.insert_one(dict(THEATER))
+    await db.shows.insert_one(dict(SHOW))
+
+async def book(server, user_id: str, seats: list):
+    try:
+        return await server.create_booking(server.BookingCreate(show_id="s1", seats=seats), {"id": user_id})
+    except HTTPException as e:
+        assert e.status_code == 400, e.detail
+        return None
+
+def test_concurrent_bookings_never_share_a_seat(server, db, monkeypatch):
+    interleave_claims(server, monkeypatch)
+
+    async def run():
+        await seed(db)
+        rng = random.Random(7)
+        requests = [rng.sample(SEATS, rng.randint(1, 4)) for _ in range(60)]
+        results = await asyncio.gather(*(book(server, f"u{i}", seats) for i, seats in enumerate(requests)))
+        return [booking for booking in results if booking]
+
+    bookings = asyncio.run(run())
+
+    assert bookings
+    seats = [seat for booking in bookings for seat in booking["seats"]]
+    assert len(seats) == len(set(seats))
+
+    inventory = asyncio.run(db.seat_inventory.find_one({"show_id": "s1"}))
+    booked = {SEATS[i] for i, state in enumerate(inventory["seats"]) if state}
+    assert booked == set(seats)
+
+def test_same_seats_booked_once(server, db, monkeypatch):
+    interleave_claims(server, monkeypatch)
+
+    async def run():
+        await seed(db)
+        return await asyncio.gather(*(book(server, f"u{i}", ["A1", "A2"]) for i in range(20)))
+
+    results = asyncio.run(run())
+
+    assert len([booking for booking in results if booking]) == 1
+
+def test_orphaned_claim_is_released(server, db):
+    async def run():
+        await seed(db)
+        inventory = await server.load_seat_inventory(db, SHOW)
+        expired = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+        # A claim whose booking insert never happened, e.g. the worker died.
+        await server.claim_seats(db, "s1", [0, 1], "lost-booking", expired)
+        kept = await book(server, "u1", ["B1"])
+        await db.seat_inventory.update_one({"show_id": "s1"}, {"$set": {"claims.1.hold_expires_at": expired}})
+
+        released = await server.reconcile_seat_claims()
+        inventory = await db.seat_inventory.find_one({"show_id": "s1"})
+        return kept, released, inventory
+
+    kept, released, inventory = asyncio.run(run())
+
+    assert released == 2
+    assert inventory["seats"][0] == inventory["seats"][1] == 0
+    assert inventory["seats"][SEATS.index("B1")] == 1
+    assert inventory["claims"] == []
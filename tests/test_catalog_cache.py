@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from pagination import encode_cursor
+
+def request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/movies", "headers": []})
+
+def test_junk_cursors_are_rejected_before_caching(server, db):
+    async def run():
+        await db.movies.insert_one({"id": "m1", "title": "Movie", "created_at": "2025-01-01T00:00:00+00:00"})
+        await server.catalog.get("movies", "m1")
+        with pytest.raises(HTTPException) as error:
+            await server.get_movies(request(), limit=100, after="not-a-cursor", view="full")
+        return error.value
+
+    error = asyncio.run(run())
+
+    assert error.status_code == 400
+    assert server.catalog.bodies.stats()["size"] == 0
+
+def test_page_bodies_cannot_evict_entities(server, db, monkeypatch):
+    monkeypatch.setattr(server.catalog.bodies, "maxsize", 5)
+
+    async def run():
+        await db.movies.insert_one({"id": "m1", "title": "Movie", "created_at": "2025-01-01T00:00:00+00:00"})
+        await server.catalog.get("movies", "m1")
+        for i in range(50):
+            await server.get_movies(request(), limit=100, after=encode_cursor([f"2025-01-{i:02d}", "x"]), view="full")
+
+    asyncio.run(run())
+
+    assert server.catalog.bodies.stats()["size"] == 5
+    assert server.catalog.entries.get(("movies", "m1")) is not None
+
+def test_single_item_reads_return_only_model_fields(server, db):
+    movie = {"id": "m1", "title": "Movie", "description": "D", "genre": "Drama", "duration": 100, "rating": "PG", "poster_url": "", "backdrop_url": "", "release_date": "2025-01-01", "created_at": "2025-01-01T00:00:00+00:00"}
+
+    async def run():
+        await db.movies.insert_one({**movie, "legacy_flag": True})
+        return await server.get_movie("m1")
+
+    response = asyncio.run(run())
+
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == movie
@@ -0,0 +1,48 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+SHOW = {"id": "s1", "movie_id": "m1", "theater_id": "t1", "screen_number": 1, "start_time": "18:00", "end_time": "20:00", "price": 10.0, "date": "2025-06-01", "created_at": "2025-01-01T00:00:00+00:00"}
+
+def booking(booking_id: str, minutes_ago: int, **fields) -> dict:
+    booked_at = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return {"id": booking_id, "user_id": "u1", "show_id": "s1", "seats": [], "total_amount": 0.0, "status": "pending", "booking_time": booked_at.isoformat(), **fields}
+
+def test_sweep_expires_lapsed_and_legacy_holds(server, db):
+    now = datetime.now(timezone.utc)
+
+    async def run():
+        await db.shows.insert_one(dict(SHOW))
+        await db.bookings.insert_many([
+            booking("lapsed", 20, hold_expires_at=(now - timedelta(minutes=5)).isoformat()),
+            booking("held", 1, hold_expires_at=(now + timedelta(minutes=14)).isoformat()),
+            # Created before holds were recorded: no hold_expires_at at all.
+            booking("legacy-old", server.SEAT_HOLD_MINUTES + 60),
+            booking("legacy-recent", 1)
+        ])
+        released = await server.release_expired_holds()
+        statuses = {b["id"]: b["status"] for b in await db.bookings.find({}, {"_id": 0}).to_list(None)}
+        return released, statuses
+
+    released, statuses = asyncio.run(run())
+
+    assert released == 2
+    assert statuses == {"lapsed": "expired", "held": "pending", "legacy-old": "expired", "legacy-recent": "pending"}
+
+def test_swept_bookings_do_not_expose_sweep_fields(server, db):
+    now = datetime.now(timezone.utc)
+
+    async def run():
+        await db.shows.insert_one(dict(SHOW))
+        await db.bookings.insert_one(booking("lapsed", 20, hold_expires_at=(now - timedelta(minutes=5)).isoformat()))
+        await server.release_expired_holds()
+        response = await server.get_my_bookings(limit=50, after=None, current_user={"id": "u1", "role": "user"})
+        single = await server.get_booking("lapsed", current_user={"id": "u1", "role": "user"})
+        return json.loads(response.body), single
+
+    bookings, single = asyncio.run(run())
+
+    assert [b["status"] for b in bookings] == ["expired"]
+    assert "expired_by" not in bookings[0]
+    assert "expired_by" not in single
+    assert set(single) <= set(server.Booking.model_fields) | {"show", "movie", "theater"}
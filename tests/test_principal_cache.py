@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+ADMIN = {"id": "admin", "email": "admin@example.com", "name": "Admin", "role": "admin", "password_hash": "x"}
+USER = {"id": "u1", "email": "user@example.com", "name": "User", "role": "user", "password_hash": "x"}
+
+def credentials(server, user: dict) -> HTTPAuthorizationCredentials:
+    token = server.create_access_token({"sub": user["id"], "email": user["email"], "name": user["name"], "role": user["role"]})
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+def test_role_change_applies_on_next_request(server, db, monkeypatch):
+    monkeypatch.setattr(server, "AUTH_MODE", "cache")
+    server.principals.clear()
+
+    async def run():
+        await db.users.insert_many([dict(ADMIN), dict(USER)])
+        before = await server.get_current_user(credentials(server, USER))
+        admin = await server.get_current_user(credentials(server, ADMIN))
+        await server.update_user_role("u1", server.UserRoleUpdate(role="admin"), admin)
+        after = await server.get_current_user(credentials(server, USER))
+        return before, after
+
+    before, after = asyncio.run(run())
+
+    assert before["role"] == "user"
+    assert after["role"] == "admin"
+
+def test_admin_cannot_demote_themselves(server, db):
+    server.principals.clear()
+
+    async def run():
+        await db.users.insert_one(dict(ADMIN))
+        admin = await server.get_current_user(credentials(server, ADMIN))
+        await server.update_user_role("admin", server.UserRoleUpdate(role="user"), admin)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 400
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from realtime import ConnectionManager
+
+def record(manager: ConnectionManager, show_id: str, versions):
+    async def run():
+        for version in versions:
+            await manager.broadcast(show_id, {"type": "seat_update", "seats": [f"A{version}"], "status": "booked", "version": version})
+    asyncio.run(run())
+
+def versions(messages):
+    return [json.loads(text)["version"] for text in messages]
+
+def test_contiguous_replay():
+    manager = ConnectionManager(history_size=10)
+    record(manager, "s1", range(1, 6))
+
+    assert versions(manager.replay("s1", 2)) == [3, 4, 5]
+
+def test_replay_orders_out_of_order_deliveries():
+    manager = ConnectionManager(history_size=10)
+    record(manager, "s1", [1, 3, 2, 4])
+
+    assert versions(manager.replay("s1", 1)) == [2, 3, 4]
+
+def test_up_to_date_client_gets_nothing():
+    manager = ConnectionManager(history_size=10)
+    record(manager, "s1", range(1, 4))
+
+    assert manager.replay("s1", 3) == []
+
+def test_gap_forces_snapshot():
+    manager = ConnectionManager(history_size=10)
+    # Version 3 never reached this worker.
+    record(manager, "s1", [1, 2, 4, 5])
+
+    assert manager.replay("s1", 1) is None
+    assert versions(manager.replay("s1", 3)) == [4, 5]
+
+def test_since_ahead_of_history_forces_snapshot():
+    manager = ConnectionManager(history_size=10)
+    record(manager, "s1", range(1, 4))
+
+    assert manager.replay("s1", 7) is None
+
+def test_evicted_history_forces_snapshot():
+    manager = ConnectionManager(history_size=3)
+    record(manager, "s1", range(1, 8))
+
+    assert manager.replay("s1", 2) is None
+    assert manager.replay("s1", 3) is None
+    assert versions(manager.replay("s1", 4)) == [5, 6, 7]
+
+def test_evicted_show_forces_snapshot():
+    manager = ConnectionManager(history_size=10, history_shows=2)
+    record(manager, "s1", [1, 2])
+    record(manager, "s2", [1])
+    record(manager, "s3", [1])
+
+    assert manager.replay("s1", 1) is None
+    assert manager.replay("unknown", 0) is None
+    assert versions(manager.replay("s3", 0)) == [1]
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+def test_client_ahead_of_inventory_gets_snapshot(server, db):
+    show = {"id": "ahead-show", "movie_id": "m1", "theater_id": "ahead-theater", "screen_number": 1, "start_time": "18:00", "end_time": "20:00", "price": 10.0, "date": "2025-06-01", "created_at": "2025-01-01T00:00:00+00:00"}
+
+    async def run():
+        await db.theaters.insert_one({"id": "ahead-theater", "name": "T", "location": "L", "screens": [{"screen_number": 1, "total_seats": 4, "seat_layout": {"rows": ["A"], "seats_per_row": 4}}], "created_at": "2025-01-01T00:00:00+00:00"})
+        await db.shows.insert_one(dict(show))
+        await db.seat_inventory.insert_one({"show_id": "ahead-show", "rows": ["A"], "seats_per_row": 4, "version": 2, "seats": [0, 0, 0, 0]})
+        # History from before the inventory's version went back to 2.
+        await server.manager.broadcast("ahead-show", {"type": "seat_update", "seats": ["A1"], "status": "booked", "version": 5})
+
+        socket = FakeSocket()
+        connection = await server.manager.connect(socket, "ahead-show")
+        await server.resync_seats(connection, "ahead-show", 5)
+        await asyncio.sleep(0)
+        server.manager.disconnect(connection)
+        return socket.sent
+
+    sent = asyncio.run(run())
+
+    assert [(message["type"], message["version"]) for message in sent] == [("seat_snapshot", 2)]
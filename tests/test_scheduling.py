@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from scheduling import count_recurrence, expand_recurrence, find_overlaps, show_interval
+
+def show(show_id: str, start: str, end: str, day: str = "2025-06-01", screen: int = 1, theater: str = "t1") -> dict:
+    return {"id": show_id, "theater_id": theater, "screen_number": screen, "date": day, "start_time": start, "end_time": end}
+
+def overlapping_ids(shows):
+    return sorted(tuple(sorted((a["id"], b["id"]))) for a, b in find_overlaps(shows))
+
+def test_back_to_back_shows_do_not_overlap():
+    assert overlapping_ids([show("a", "14:00", "16:00"), show("b", "16:00", "18:00")]) == []
+
+def test_overlap_on_the_same_screen():
+    assert overlapping_ids([show("a", "14:00", "16:30"), show("b", "16:00", "18:00")]) == [("a", "b")]
+
+def test_other_screens_and_theaters_are_independent():
+    shows = [show("a", "14:00", "16:30"), show("b", "15:00", "17:00", screen=2), show("c", "15:00", "17:00", theater="t2")]
+    assert overlapping_ids(shows) == []
+
+def test_long_show_overlaps_several_later_ones():
+    shows = [show("long", "10:00", "18:00"), show("b", "11:00", "12:00"), show("c", "13:00", "14:00")]
+    assert overlapping_ids(shows) == [("b", "long"), ("c", "long")]
+
+def test_show_past_midnight_runs_into_the_next_day():
+    late = show("late", "23:00", "01:30")
+    assert show_interval(late)[1] - show_interval(late)[0] == 150
+    assert overlapping_ids([late, show("early", "01:00", "03:00", day="2025-06-02")]) == [("early", "late")]
+    assert overlapping_ids([late, show("later", "01:30", "03:00", day="2025-06-02")]) == []
+    assert overlapping_ids([late, show("same-day", "01:00", "03:00")]) == []
+
+def test_invalid_time_is_rejected():
+    with pytest.raises(ValueError):
+        find_overlaps([show("a", "25:00", "26:00")])
+
+def test_expand_recurrence_honours_weekdays_and_crosses_midnight():
+    shows = expand_recurrence("m1", "t1", 1, 10.0, "2025-06-02", "2025-06-15", ["12:00", "22:30"], 150, weekdays=[4, 5])
+    assert {s["date"] for s in shows} == {"2025-06-06", "2025-06-07", "2025-06-13", "2025-06-14"}
+    assert len(shows) == 8
+    assert {s["end_time"] for s in shows} == {"14:30", "01:00"}
+
+@pytest.mark.parametrize("start, end, weekdays", [
+    ("2025-06-01", "2025-06-01", None),
+    ("2025-06-01", "2025-06-30", None),
+    ("2025-06-03", "2025-07-19", [0, 2, 6]),
+    ("2025-06-03", "2025-06-05", [5]),
+    ("2025-06-01", "2025-12-31", [0, 1, 2, 3, 4, 5, 6])
+])
+def test_count_matches_expansion(start, end, weekdays):
+    times = ["10:00", "19:00"]
+    assert count_recurrence(start, end, times, weekdays) == len(expand_recurrence("m1", "t1", 1, 10.0, start, end, times, 120, weekdays))
+
+def test_count_rejects_reversed_range():
+    with pytest.raises(ValueError):
+        count_recurrence("2025-06-02", "2025-06-01", ["10:00"])
+
+THEATER = {"id": "t1", "name": "Theater", "location": "Here", "screens": [{"screen_number": 1, "total_seats": 2, "seat_layout": {"rows": ["A"], "seats_per_row": 2}}]}
+ADMIN = {"id": "admin", "role": "admin"}
+
+def test_concurrent_schedules_for_one_screen_never_overlap(server, db, monkeypatch):
+    find_conflicts = server.find_schedule_conflicts
+
+    async def slow_find_conflicts(shows):
+        # mongomock answers without yielding; give other requests a chance to
+        # run between the conflict check and the write, as a real round-trip would.
+        conflicts = await find_conflicts(shows)
+        await asyncio.sleep(0.01)
+        return conflicts
+
+    monkeypatch.setattr(server, "find_schedule_conflicts", slow_find_conflicts)
+
+    async def create(start: str):
+        request = server.ShowCreate(movie_id="m1", theater_id="t1", screen_number=1, start_time=start, end_time="23:00", price=10.0, date="2025-06-01")
+        try:
+            return await server.create_show(request, ADMIN)
+        except HTTPException as e:
+            assert e.status_code == 409
+            return None
+
+    async def run():
+        await db.theaters.insert_one(dict(THEATER))
+        await asyncio.gather(*(create(f"{hour:02d}:00") for hour in range(10, 20)))
+        return await db.shows.find({}, {"_id": 0}).to_list(None)
+
+    shows = asyncio.run(run())
+
+    assert len(shows) == 1
+    assert asyncio.run(db.schedule_locks.count_documents({})) == 0
+
+def test_oversized_schedule_is_rejected_before_expanding(server, monkeypatch):
+    monkeypatch.setattr(server, "MAX_BULK_SHOWS", 10)
+    rule = server.ShowRecurrence(movie_id="m1", theater_id="t1", screen_number=1, price=10.0, start_date="2025-01-01", end_date="2125-01-01", start_times=["10:00"], duration_minutes=120)
+    monkeypatch.setattr(server, "expand_recurrence", lambda **kwargs: pytest.fail("expanded an oversized schedule"))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.schedule_shows(server.ShowSchedule(recurrences=[rule]), False, ADMIN))
+    assert error.value.status_code == 400
+
+def test_malformed_stored_show_does_not_block_scheduling(server, db):
+    async def run():
+        await db.theaters.insert_one(dict(THEATER))
+        await db.shows.insert_many([
+            {**show("legacy", "7pm", "9pm"), "movie_id": "m1", "price": 10.0},
+            {**show("evening", "18:00", "20:00"), "movie_id": "m1", "price": 10.0}
+        ])
+        clash = await server.find_schedule_conflicts([{**show("new-clash", "19:00", "21:00"), "movie_id": "m2"}])
+        clear = await server.find_schedule_conflicts([{**show("new-clear", "21:00", "23:00"), "movie_id": "m2"}])
+        with pytest.raises(HTTPException) as error:
+            await server.find_schedule_conflicts([{**show("new-bad", "9pm", "23:00"), "movie_id": "m2"}])
+        return clash, clear, error.value
+
+    clash, clear, error = asyncio.run(run())
+
+    assert [c["conflicts_with"]["id"] for c in clash] == ["evening"]
+    assert clear == []
+    assert error.status_code == 400
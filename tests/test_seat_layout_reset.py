@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from seat_inventory import SEAT_BOOKED, load_seat_inventory, mark_seats
+
+SHOW = {"id": "layout-show", "movie_id": "m1", "theater_id": "layout-theater", "screen_number": 1, "start_time": "18:00", "end_time": "20:00", "price": 10.0, "date": "2025-06-01", "created_at": "2025-01-01T00:00:00+00:00"}
+
+def theater(rows) -> dict:
+    return {"id": "layout-theater", "name": "T", "location": "L", "screens": [{"screen_number": 1, "total_seats": len(rows) * 4, "seat_layout": {"rows": rows, "seats_per_row": 4}}], "created_at": "2025-01-01T00:00:00+00:00"}
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+def test_layout_change_keeps_version_and_resets_subscribers(server, db):
+    async def run():
+        await db.theaters.insert_one(theater(["A", "B"]))
+        await db.shows.insert_one(dict(SHOW))
+        await load_seat_inventory(db, SHOW)
+        version = await mark_seats(db, SHOW["id"], [0], SEAT_BOOKED)
+        await server.manager.broadcast(SHOW["id"], {"type": "seat_update", "seats": ["A1"], "status": "booked", "version": version})
+        version = await mark_seats(db, SHOW["id"], [0], 0)
+
+        socket = FakeSocket()
+        connection = await server.manager.connect(socket, SHOW["id"])
+        await db.theaters.update_one({"id": "layout-theater"}, {"$set": theater(["A", "B", "C"])})
+        await server.reset_seat_layouts([SHOW["id"]])
+        await asyncio.sleep(0)
+        server.manager.disconnect(connection)
+        inventory = await load_seat_inventory(db, SHOW)
+        return version, inventory, socket.sent
+
+    before, inventory, sent = asyncio.run(run())
+
+    assert inventory["version"] == before + 1
+    assert inventory["rows"] == ["A", "B", "C"]
+    assert SHOW["id"] not in server.manager.history
+    assert server.manager.replay(SHOW["id"], 0) is None
+    assert [message["type"] for message in sent] == ["seat_snapshot"]
+    assert sent[0]["version"] == before + 1
+    assert len(sent[0]["seats"]) == 3